@@ -1,7 +1,7 @@
 from flask import Flask
 from flask_login import LoginManager
 
-from app.extensions import db
+from app.extensions import db, migrate
 from app.config import Config
 
 # Blueprints
@@ -12,6 +12,8 @@ from app.routes.director import director_bp
 from app.routes.finance import finance_bp
 from app.routes.audit import audit_bp
 from app.routes.users import users_bp
+from app.routes.uploads import uploads_bp
+from app.routes.dashboard import dashboard_bp
 
 # ✅ NEW (SAFE): Reports
 from app.routes.reports import reports_bp
@@ -29,6 +31,7 @@ def create_app():
 
     # ✅ Init DB
     db.init_app(app)
+    migrate.init_app(app, db)
 
     # ✅ INIT LOGIN MANAGER
     login_manager = LoginManager()
@@ -36,11 +39,13 @@ def create_app():
     login_manager.init_app(app)
 
     # User loader
-    from app.models.user import User
+    from app.user_cache import init_user_cache, load_cached_user
+    init_user_cache(app)
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # Cached, read-only user record: no users query on most requests
+        return load_cached_user(user_id)
 
     # Register blueprints (DO NOT rename these)
     app.register_blueprint(auth_bp)
@@ -50,6 +55,8 @@ def create_app():
     app.register_blueprint(finance_bp)
     app.register_blueprint(audit_bp)
     app.register_blueprint(users_bp)
+    app.register_blueprint(uploads_bp)
+    app.register_blueprint(dashboard_bp)
 
     # ✅ NEW: Reports (READ-ONLY)
     app.register_blueprint(reports_bp)
@@ -61,4 +68,44 @@ def create_app():
     except Exception as e:
         app.logger.warning(f"AUDIT DISABLED: {e}")
 
+    # Per-request summary columns (quotation/payment counts, total paid)
+    from app.summaries import init_summaries
+    init_summaries(app)
+
+    # Full-text search index upkeep (tsvector / FTS5)
+    from app.search import init_search
+    init_search(app)
+
+    # Vendor dropdown/list cache
+    from app.vendor_cache import init_vendor_cache
+    init_vendor_cache(app)
+
+    # Background quotation/receipt uploads
+    from app.uploads import init_uploads
+    init_uploads(app)
+
+    # Report rollup tables (daily/monthly spend, requests per day)
+    from app.rollups import init_rollups
+    init_rollups(app)
+
+    # Report data watermark, /reports payload cache, background PDF reports
+    from app.data_version import init_data_version
+    init_data_version(app)
+    from app.report_cache import init_report_cache
+    init_report_cache(app)
+    from app.pdf_reports import init_pdf_reports
+    init_pdf_reports(app)
+
+    # Dashboard KPI snapshot (patched on commit, not recomputed per view)
+    from app.kpis import init_kpis
+    init_kpis(app)
+
+    # Payment form idempotency tokens
+    from app.idempotency import init_idempotency
+    init_idempotency(app)
+
+    # Maintenance CLI (`flask rebuild-summaries`, ...)
+    from app.commands import register_commands
+    register_commands(app)
+
     return app
@@ -1,15 +1,16 @@
 from __future__ import annotations
 
 import json
-from datetime import datetime
-from typing import Any, Dict
+from datetime import date, datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
 
 from flask import g, has_request_context, request
 from flask_login import current_user
-from sqlalchemy import text
+from sqlalchemy import event, insert
 from sqlalchemy import inspect as sa_inspect
 
 from app.extensions import db
+from app.models.audit_log import AuditLog
 
 
 def _actor_payload() -> Dict[str, Any]:
@@ -51,183 +52,287 @@ def _actor_payload() -> Dict[str, Any]:
     return payload
 
 
-def _safe_insert(connection, payload: Dict[str, Any]) -> None:
-    """
-    Tries to insert audit row with full columns.
-    If DB schema differs, it falls back to minimal insert that still satisfies NOT NULL constraints.
-    This must NEVER crash your app.
-    """
-    # Ensure legacy required columns are always present
-    entity = payload.get("entity") or payload.get("entity_type") or "Unknown"
-    action = payload.get("action") or "unknown"
+# Columns of the live audit_logs table, probed once (see audit_columns).
+# Older databases only have (entity, action, created_at); rows are trimmed
+# to what exists instead of trying INSERT variants until one sticks.
+_columns: Optional[FrozenSet[str]] = None
 
-    payload["entity"] = entity
-    payload["action"] = action
 
-    # Convert changes safely
-    changes_val = payload.get("changes")
-    if isinstance(changes_val, (dict, list)):
-        try:
-            payload["changes_json"] = json.dumps(changes_val)
-        except Exception:
-            payload["changes_json"] = "{}"
-    elif isinstance(changes_val, str):
-        payload["changes_json"] = changes_val
-    else:
-        payload["changes_json"] = "{}"
+def _probe_columns(bind) -> FrozenSet[str]:
+    try:
+        return frozenset(c["name"] for c in sa_inspect(bind).get_columns(AuditLog.__tablename__))
+    except Exception:
+        return frozenset()
 
-    payload["created_at"] = payload.get("created_at") or datetime.utcnow()
 
-    # Attempt 1: full insert (new schema)
+def audit_columns(connection) -> FrozenSet[str]:
+    global _columns
+    if _columns is None:
+        found = _probe_columns(connection)
+        if not found:
+            return found  # table not there (yet): try again next time
+        _columns = found
+    return _columns
+
+
+def _jsonable(value: Any) -> Any:
+    # Plain JSON-safe structure for the JSON column (Decimal/datetime -> str)
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return {"value": value}
+    if not isinstance(value, (dict, list)):
+        return {}
     try:
-        connection.execute(
-            text(
-                """
-                INSERT INTO audit_logs
-                (entity, entity_type, entity_id, action, changes, actor_user_id, actor_role, actor_name, ip_address, user_agent, created_at)
-                VALUES
-                (:entity, :entity_type, :entity_id, :action, CAST(:changes_json AS JSON), :actor_user_id, :actor_role, :actor_name, :ip_address, :user_agent, :created_at)
-                """
-            ),
-            payload,
-        )
-        return
+        return json.loads(json.dumps(value, default=str))
     except Exception:
-        pass
+        return {}
 
-    # Attempt 2: without JSON cast
-    try:
-        connection.execute(
-            text(
-                """
-                INSERT INTO audit_logs
-                (entity, entity_type, entity_id, action, changes, actor_user_id, actor_role, actor_name, ip_address, user_agent, created_at)
-                VALUES
-                (:entity, :entity_type, :entity_id, :action, :changes_json, :actor_user_id, :actor_role, :actor_name, :ip_address, :user_agent, :created_at)
-                """
-            ),
-            payload,
-        )
+
+def _audit_row(entity_type: str, entity_id: Any, action: str, changes: Any, actor: Dict[str, Any], created_at: datetime) -> Dict[str, Any]:
+    entity_type = entity_type or "Unknown"
+    return {
+        "entity": entity_type,  # legacy NOT NULL
+        "entity_type": entity_type,
+        "entity_id": None if entity_id is None else str(entity_id),
+        "action": action or "unknown",
+        "changes": _jsonable(changes),
+        **actor,
+        "created_at": created_at,
+    }
+
+
+def insert_audit_rows(connection, rows: List[Dict[str, Any]]) -> None:
+    """
+    One executemany for all rows (JSON goes through the column type, so it is
+    stored as JSON on Postgres and as text on SQLite). Raises on DB errors.
+    """
+    if not rows:
         return
-    except Exception:
-        pass
+    columns = audit_columns(connection)
+    if not columns:
+        raise RuntimeError("audit_logs table not found")
+    keys = [k for k in rows[0] if k in columns]
+    connection.execute(insert(AuditLog.__table__), [{k: row.get(k) for k in keys} for row in rows])
+
 
-    # Attempt 3: legacy minimal columns (guaranteed to exist in your DB)
+def _write_rows(connection, rows: List[Dict[str, Any]]) -> None:
+    """Sync mode: inside the business transaction. This must NEVER crash your app."""
     try:
-        connection.execute(
-            text(
-                """
-                INSERT INTO audit_logs (entity, action, created_at)
-                VALUES (:entity, :action, :created_at)
-                """
-            ),
-            {"entity": entity, "action": action, "created_at": payload["created_at"]},
-        )
+        # Own savepoint: a failed INSERT aborts the whole transaction on
+        # Postgres, so roll back only the audit rows, not the business write.
+        with connection.begin_nested():
+            insert_audit_rows(connection, rows)
     except Exception:
         # Worst case: do nothing (never crash the business app)
         return
 
 
+# ---------------- AUDIT_MODE=async ----------------
+# Rows wait in session.info until the business transaction commits, then go
+# to app/audit_sink.py (spool file + background insert). Rows are tagged
+# with the savepoint they were flushed in so a rolled-back savepoint drops
+# only its own rows.
+
+_async = False
+
+
+def _emit(session, rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    if not _async:
+        _write_rows(session.connection(), rows)
+        return
+    savepoint = session.get_nested_transaction()
+    session.info.setdefault("audit_pending", []).extend((savepoint, row) for row in rows)
+
+
+def _after_commit(session):
+    # Also fires on savepoint release: the rows wait for the real commit
+    if session.get_nested_transaction() is not None:
+        return
+    pending = session.info.pop("audit_pending", None)
+    if pending:
+        from app.audit_sink import enqueue
+        enqueue([row for _savepoint, row in pending])
+
+
+def _after_soft_rollback(session, previous_transaction):
+    pending = session.info.get("audit_pending")
+    if not pending:
+        return
+    if previous_transaction.nested:
+        session.info["audit_pending"] = [(sp, row) for sp, row in pending if sp is not previous_transaction]
+    elif previous_transaction.parent is None:
+        # (a flush failing inside a savepoint rolls back its own
+        # subtransaction first: only the outermost one drops everything)
+        session.info.pop("audit_pending", None)
+
+
 def _get_pk_str(target: Any) -> str | None:
     try:
         insp = sa_inspect(target)
         if insp.identity and len(insp.identity) > 0:
             return str(insp.identity[0])
+        # Just-inserted rows get their identity key after after_flush
+        pk = insp.mapper.primary_key_from_instance(target)
+        if pk and pk[0] is not None:
+            return str(pk[0])
     except Exception:
         pass
     return None
 
 
-def _changes_dict(target: Any) -> Dict[str, Any]:
+# Derived / pipeline bookkeeping: maintained by other hooks, not user changes
+_SKIP_FIELDS = {
+    "id",
+    "effective_paid_at",
+    "quotation_count",
+    "payment_count",
+    "total_paid",
+    "last_paid_at",
+    "latest_receipt_url",
+}
+# Recorded as "changed", never stored
+_REDACTED_FIELDS = {"password_hash"}
+_MAX_TEXT = 500
+
+
+def _plain(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return value if len(value) <= _MAX_TEXT else value[:_MAX_TEXT] + "…"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)  # Decimal & friends
+
+
+def _snapshot(target: Any) -> Dict[str, Any]:
     """
-    Best-effort change capture.
-    For inserts we typically don't have 'history' yet, so this stays small.
+    Compact snapshot for create/delete: set (non-NULL) columns only,
+    long text cut at _MAX_TEXT.
     """
     try:
         insp = sa_inspect(target)
         changes: Dict[str, Any] = {}
         for attr in insp.mapper.column_attrs:
             key = attr.key
-            # avoid huge blobs
-            if key in ("password_hash",):
+            if key in _SKIP_FIELDS or key in _REDACTED_FIELDS:
                 continue
             try:
                 val = getattr(target, key, None)
-                if isinstance(val, (str, int, float, bool)) or val is None:
-                    changes[key] = val
             except Exception:
                 continue
+            if val is not None:
+                changes[key] = _plain(val)
         return changes
     except Exception:
         return {}
 
 
+def _diff(target: Any) -> Dict[str, Any]:
+    """
+    Update diff: {field: {"old": ..., "new": ...}} for attributes whose
+    history changed in this flush. Empty dict => nothing worth logging.
+    """
+    try:
+        insp = sa_inspect(target)
+        changes: Dict[str, Any] = {}
+        for attr in insp.mapper.column_attrs:
+            key = attr.key
+            if key in _SKIP_FIELDS:
+                continue
+            hist = insp.attrs[key].history
+            if not hist.has_changes():
+                continue
+            new = hist.added[0] if hist.added else None
+            if key in _REDACTED_FIELDS:
+                changes[key] = "changed"
+            elif hist.deleted:
+                if hist.deleted[0] == new:
+                    continue
+                changes[key] = {"old": _plain(hist.deleted[0]), "new": _plain(new)}
+            else:
+                # Set on an expired/unloaded attribute: old value unknown
+                changes[key] = {"new": _plain(new)}
+        return changes
+    except Exception:
+        return {}
+
+
+def write_audit_events(connection, events: Iterable[Tuple[str, Any, str, Dict[str, Any]]]) -> None:
+    """
+    Audit rows for set-based writes that bypass the ORM flush hooks
+    (bulk import, bulk approve/reject), in one executemany.
+    events: (entity_type, entity_id, action, changes)
+    """
+    actor = _actor_payload()
+    now = datetime.utcnow()
+    rows = [_audit_row(entity_type, entity_id, action, changes, actor, now) for entity_type, entity_id, action, changes in events]
+    if _async:
+        _emit(db.session(), rows)  # callers write through db.session's connection
+    else:
+        _write_rows(connection, rows)
+
+
+# Track only your important business entities
+TRACKED_MODELS = {
+    "ProcurementRequest",
+    "Vendor",
+    "Payment",
+    "ProcurementQuotation",
+    "User",
+}
+
+
+def _should_track(target: Any) -> bool:
+    try:
+        return target.__class__.__name__ in TRACKED_MODELS
+    except Exception:
+        return False
+
+
+def _after_flush(session, flush_context):
+    # Log inserts/updates/deletes after flush so PK exists
+    try:
+        actor = None
+        now = datetime.utcnow()
+        rows: List[Dict[str, Any]] = []
+        for action, objects in (("create", session.new), ("update", session.dirty), ("delete", session.deleted)):
+            for obj in objects:
+                if not _should_track(obj):
+                    continue
+                changes = _diff(obj) if action == "update" else _snapshot(obj)
+                if action == "update" and not changes:
+                    continue  # only derived columns (or nothing) changed
+                if actor is None:
+                    actor = _actor_payload()  # once per flush, not per object
+                rows.append(_audit_row(obj.__class__.__name__, _get_pk_str(obj), action, changes, actor, now))
+        _emit(session, rows)
+    except Exception:
+        return
+
+
 def init_audit(app) -> None:
     """
     Hooks into SQLAlchemy and logs create/update/delete for key models.
     IMPORTANT: This MUST NEVER break the app even if schema changes.
     """
-    from sqlalchemy import event
-
-    # Track only your important business entities
-    TRACKED_MODELS = {
-        "ProcurementRequest",
-        "Vendor",
-        "Payment",
-        "ProcurementQuotation",
-        "User",
-    }
-
-    def should_track(target: Any) -> bool:
-        try:
-            return target.__class__.__name__ in TRACKED_MODELS
-        except Exception:
-            return False
-
-    def make_payload(target: Any, action: str) -> Dict[str, Any]:
-        actor = _actor_payload()
-        entity_type = target.__class__.__name__
-        return {
-            "entity": entity_type,               # satisfy legacy NOT NULL
-            "entity_type": entity_type,
-            "entity_id": _get_pk_str(target),
-            "action": action,
-            "changes": _changes_dict(target),
-            **actor,
-            "created_at": datetime.utcnow(),
-        }
-
-    @event.listens_for(db.session, "after_flush")
-    def receive_after_flush(session, flush_context):
-        # Log inserts/updates/deletes after flush so PK exists
-        try:
-            connection = session.connection()
-        except Exception:
-            return
-
-        # INSERTS
-        for obj in list(session.new):
-            if not should_track(obj):
-                continue
-            try:
-                _safe_insert(connection, make_payload(obj, "create"))
-            except Exception:
-                continue
+    global _columns, _async
+    try:
+        with app.app_context():
+            _columns = _probe_columns(db.engine) or None
+    except Exception:
+        _columns = None
 
-        # UPDATES
-        for obj in list(session.dirty):
-            if not should_track(obj):
-                continue
-            try:
-                _safe_insert(connection, make_payload(obj, "update"))
-            except Exception:
-                continue
+    _async = (app.config.get("AUDIT_MODE") or "sync").lower() == "async"
+    if _async:
+        from app.audit_sink import init_audit_sink
+        init_audit_sink(app)
 
-        # DELETES
-        for obj in list(session.deleted):
-            if not should_track(obj):
-                continue
-            try:
-                _safe_insert(connection, make_payload(obj, "delete"))
-            except Exception:
-                continue
+    if not event.contains(db.session, "after_flush", _after_flush):
+        event.listen(db.session, "after_flush", _after_flush)
+        event.listen(db.session, "after_commit", _after_commit)
+        event.listen(db.session, "after_soft_rollback", _after_soft_rollback)
@@ -0,0 +1,341 @@
+"""
+Audit log partitions + cold archive.
+
+Hot table
+  Postgres: audit_logs is PARTITION BY RANGE (created_at), one partition per
+  month (audit_logs_yYYYYmMM) plus audit_logs_default for anything outside
+  them (migration c5d9a3e7f812). ensure_partitions() creates the upcoming
+  months; run `flask audit-partitions` from cron.
+  SQLite: no partitioning, audit_logs stays one table and closed months are
+  removed by created_at range (ix_audit_logs_created_at_id), which gives the
+  same rolling "last N months hot" window.
+
+Cold archive (`flask archive-audit`)
+  Every month older than AUDIT_HOT_MONTHS is exported to
+  <AUDIT_ARCHIVE_DIR>/audit-YYYY-MM-<part>.jsonl.gz and removed from the
+  hot table (DROP of the month's partition on Postgres, range DELETE
+  elsewhere). The .gz is a valid multi-member gzip file of JSON lines, each
+  member holding ARCHIVE_CHUNK_ROWS rows. The .index.json sidecar records
+  every member's byte offset and which members mention which entity, so an
+  entity's history is read by decompressing only those members.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, select, text
+
+from app.models.audit_log import AuditLog
+
+ARCHIVE_CHUNK_ROWS = 1000
+SIDECAR_SUFFIX = ".index.json"
+
+
+# ---------------- Months ----------------
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + (value.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def month_label(month: datetime) -> str:
+    return f"{month.year:04d}-{month.month:02d}"
+
+
+# ---------------- Postgres partitions ----------------
+
+def partition_name(month: datetime) -> str:
+    return f"audit_logs_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    kind = connection.execute(text("SELECT relkind FROM pg_class WHERE relname = 'audit_logs'")).scalar()
+    return kind == "p"
+
+
+def ensure_partitions(connection, months_ahead: int = 2) -> List[str]:
+    """Creates the current + next `months_ahead` monthly partitions (Postgres). Returns new names."""
+    if not is_partitioned(connection):
+        return []
+    created = []
+    first = month_start(datetime.utcnow())
+    for i in range(months_ahead + 1):
+        month = add_months(first, i)
+        name = partition_name(month)
+        exists = connection.execute(text("SELECT 1 FROM pg_class WHERE relname = :n"), {"n": name}).scalar()
+        if exists:
+            continue
+        try:
+            # Savepoint: fails if audit_logs_default already holds rows of that month
+            with connection.begin_nested():
+                connection.execute(
+                    text(
+                        f"CREATE TABLE {name} PARTITION OF audit_logs "
+                        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+                    )
+                )
+            created.append(name)
+        except Exception:
+            continue
+    return created
+
+
+# ---------------- Archive files ----------------
+
+def archive_dir(app) -> str:
+    folder = app.config.get("AUDIT_ARCHIVE_DIR") or os.path.join(os.path.abspath(os.path.join(app.root_path, "..")), "audit_archive")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def archive_parts(folder: str, month: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Sidecars of the archive (optionally one month), oldest first."""
+    prefix = f"audit-{month_label(month)}-" if month else "audit-"
+    parts = []
+    for name in os.listdir(folder):
+        if not (name.startswith(prefix) and name.endswith(SIDECAR_SUFFIX)):
+            continue
+        try:
+            with open(os.path.join(folder, name)) as fh:
+                parts.append(json.load(fh))
+        except (OSError, ValueError):
+            continue
+    parts.sort(key=lambda p: (p.get("month", ""), p.get("part", 0)))
+    return parts
+
+
+def _entity_key(entity_type: Any, entity_id: Any) -> str:
+    return f"{entity_type}:{entity_id}"
+
+
+def _encode_row(row: Dict[str, Any]) -> str:
+    out = dict(row)
+    if isinstance(out.get("created_at"), datetime):
+        out["created_at"] = out["created_at"].isoformat()
+    return json.dumps(out, default=str, separators=(",", ":"))
+
+
+def _decode_row(line: str) -> Dict[str, Any]:
+    row = json.loads(line)
+    try:
+        row["created_at"] = datetime.fromisoformat(row["created_at"])
+    except (KeyError, TypeError, ValueError):
+        row["created_at"] = None
+    return row
+
+
+def _write_part(folder: str, month: datetime, part: int, rows: Iterable[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Writes one archive part + sidecar. Returns the sidecar, or None when there were no rows."""
+    base = f"audit-{month_label(month)}-{part}"
+    data_path = os.path.join(folder, base + ".jsonl.gz")
+    tmp_path = data_path + ".tmp"
+
+    sidecar: Dict[str, Any] = {
+        "month": month_label(month),
+        "part": part,
+        "file": os.path.basename(data_path),
+        "rows": 0,
+        "min_id": None,
+        "max_id": None,
+        "first_created_at": None,
+        "last_created_at": None,
+        "chunks": [],     # [offset, length, rows] per gzip member
+        "entities": {},   # "Type:id" -> [chunk index, ...]
+    }
+    entities: Dict[str, set] = {}
+
+    def flush_chunk(fh, lines: List[str]) -> None:
+        payload = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"))
+        sidecar["chunks"].append([fh.tell(), len(payload), len(lines)])
+        fh.write(payload)
+
+    try:
+        with open(tmp_path, "wb") as fh:
+            lines: List[str] = []
+            for row in rows:
+                chunk_index = len(sidecar["chunks"])
+                entity_type = row.get("entity_type") or row.get("entity")
+                entities.setdefault(_entity_key(entity_type, row.get("entity_id")), set()).add(chunk_index)
+
+                row_id = row.get("id")
+                if row_id is not None:
+                    sidecar["min_id"] = row_id if sidecar["min_id"] is None else min(sidecar["min_id"], row_id)
+                    sidecar["max_id"] = row_id if sidecar["max_id"] is None else max(sidecar["max_id"], row_id)
+                created = row.get("created_at")
+                if isinstance(created, datetime):
+                    if sidecar["first_created_at"] is None:
+                        sidecar["first_created_at"] = created.isoformat()
+                    sidecar["last_created_at"] = created.isoformat()
+
+                lines.append(_encode_row(row))
+                sidecar["rows"] += 1
+                if len(lines) >= ARCHIVE_CHUNK_ROWS:
+                    flush_chunk(fh, lines)
+                    lines = []
+            if lines:
+                flush_chunk(fh, lines)
+            fh.flush()
+            os.fsync(fh.fileno())
+
+        if not sidecar["rows"]:
+            os.remove(tmp_path)
+            return None
+
+        sidecar["entities"] = {k: sorted(v) for k, v in entities.items()}
+        os.replace(tmp_path, data_path)
+        sidecar_tmp = os.path.join(folder, base + SIDECAR_SUFFIX + ".tmp")
+        with open(sidecar_tmp, "w") as fh:
+            json.dump(sidecar, fh, separators=(",", ":"))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(sidecar_tmp, os.path.join(folder, base + SIDECAR_SUFFIX))
+        return sidecar
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# ---------------- Archiving ----------------
+
+def _month_filter(month: datetime):
+    return and_(AuditLog.created_at >= month, AuditLog.created_at < add_months(month, 1))
+
+
+def _iter_month_rows(connection, month: datetime, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    from app.audit import audit_columns
+
+    columns = audit_columns(connection)
+    cols = [c for c in AuditLog.__table__.columns if c.name in columns]
+    stmt = (
+        select(*cols)
+        .where(_month_filter(month))
+        .order_by(AuditLog.created_at, AuditLog.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = connection.execute(stmt)
+    try:
+        for row in result.mappings():
+            yield dict(row)
+    finally:
+        result.close()
+
+
+def _drop_from_hot(connection, month: datetime, sidecar: Dict[str, Any]) -> str:
+    """Removes the archived rows of `month` from the hot table. Returns how."""
+    name = partition_name(month)
+    if is_partitioned(connection) and connection.execute(
+        text("SELECT 1 FROM pg_class WHERE relname = :n"), {"n": name}
+    ).scalar():
+        # Whole partition, if nothing arrived for that month since the export
+        connection.execute(text(f"LOCK TABLE {name} IN ACCESS EXCLUSIVE MODE"))
+        count = connection.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+        if count == sidecar["rows"]:
+            connection.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {name}"))
+            connection.execute(text(f"DROP TABLE {name}"))
+            return "dropped partition"
+
+    connection.execute(delete(AuditLog.__table__).where(_month_filter(month), AuditLog.id <= sidecar["max_id"]))
+    return "deleted rows"
+
+
+def archive_month(connection, month: datetime, folder: str) -> Tuple[int, Optional[str]]:
+    """
+    Exports one closed month to a new archive part and removes it from the
+    hot table. Returns (rows archived, how they were removed).
+    Caller commits.
+    """
+    # A previous run may have written a part but failed before the delete
+    # committed: those rows are already archived, just remove them.
+    parts = archive_parts(folder, month)
+    archived_max_id = max((p.get("max_id") or 0 for p in parts), default=0)
+    if archived_max_id:
+        connection.execute(delete(AuditLog.__table__).where(_month_filter(month), AuditLog.id <= archived_max_id))
+
+    part = max((p.get("part", 0) for p in parts), default=0) + 1
+    sidecar = _write_part(folder, month, part, _iter_month_rows(connection, month))
+    if sidecar is None:
+        return 0, None
+    return sidecar["rows"], _drop_from_hot(connection, month, sidecar)
+
+
+def closed_months(connection, keep_months: int) -> List[datetime]:
+    """Months with audit rows that are older than the hot window (keep_months incl. the current one)."""
+    cutoff = add_months(month_start(datetime.utcnow()), -(max(1, keep_months) - 1))
+    oldest = connection.execute(select(func.min(AuditLog.created_at))).scalar()
+    if oldest is None:
+        return []
+    months = []
+    month = month_start(oldest)
+    while month < cutoff:
+        has_rows = connection.execute(select(AuditLog.id).where(_month_filter(month)).limit(1)).first()
+        if has_rows:
+            months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+# ---------------- Reader ----------------
+
+def _read_chunk(fh, offset: int, length: int) -> List[str]:
+    fh.seek(offset)
+    raw = zlib.decompress(fh.read(length), 16 + zlib.MAX_WBITS)
+    return raw.decode("utf-8").splitlines()
+
+
+def iter_archived_events(
+    entities: Iterable[Tuple[str, Any]],
+    folder: str,
+    start_dt: Optional[datetime] = None,
+    end_dt: Optional[datetime] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Archived audit rows for any of the (entity_type, entity_id) pairs, oldest
+    first. Only the gzip members the sidecars list for those entities are
+    read.
+    """
+    keys = {_entity_key(t, i) for t, i in entities}
+    if not keys:
+        return
+    for part in archive_parts(folder):
+        first, last = part.get("first_created_at"), part.get("last_created_at")
+        if end_dt is not None and first and datetime.fromisoformat(first) > end_dt:
+            continue
+        if start_dt is not None and last and datetime.fromisoformat(last) < start_dt:
+            continue
+        chunk_ids = sorted({c for key in keys for c in part.get("entities", {}).get(key, ())})
+        if not chunk_ids:
+            continue
+        with open(os.path.join(folder, part["file"]), "rb") as fh:
+            for chunk_id in chunk_ids:
+                offset, length, _rows = part["chunks"][chunk_id]
+                for line in _read_chunk(fh, offset, length):
+                    row = _decode_row(line)
+                    if _entity_key(row.get("entity_type") or row.get("entity"), row.get("entity_id")) not in keys:
+                        continue
+                    created = row.get("created_at")
+                    if start_dt is not None and (created is None or created < start_dt):
+                        continue
+                    if end_dt is not None and (created is None or created > end_dt):
+                        continue
+                    yield row
+
+
+def iter_archived_month(month: datetime, folder: str) -> Iterator[Dict[str, Any]]:
+    """Every archived row of one month (all parts)."""
+    for part in archive_parts(folder, month):
+        with gzip.open(os.path.join(folder, part["file"]), "rt", encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    yield _decode_row(line)
@@ -0,0 +1,334 @@
+"""
+Asynchronous audit sink (AUDIT_MODE=async).
+
+Committed audit rows are appended to a local spool file first, then put on
+an in-process queue. One background thread drains the queue and inserts
+rows into audit_logs in batches (one executemany per batch), outside any
+business transaction.
+
+Spool layout (<AUDIT_SPOOL_DIR>/audit-<pid>-<segment>.jsonl):
+  - one JSON row per line, append-only
+  - every open segment is flock()ed by its process
+  - a segment is truncated / deleted once all its rows are in the DB
+  - segments rotate at AUDIT_SPOOL_MAX_BYTES
+
+A batch that still fails after AUDIT_MAX_ATTEMPTS is moved to its own
+dead-letter file (audit-dead-<pid>-<n>.jsonl, written once, never locked)
+and its segments are released as usual, so rows that did make it in are
+never replayed with it.
+
+On startup any segment that nobody holds a lock on (its process died) and
+any dead-letter file is replayed into audit_logs and removed. Delivery is
+at-least-once: a crash between the insert and the truncate replays those
+rows again.
+
+AUDIT_MODE=sync (default) keeps writing inside the business transaction.
+"""
+
+from __future__ import annotations
+
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to a pid check
+    fcntl = None
+
+from app.extensions import db
+
+_app = None
+_pid: Optional[int] = None
+_lock = threading.Lock()
+_queue: "queue.Queue[Tuple[int, List[Dict[str, Any]]]]" = queue.Queue()
+_thread: Optional[threading.Thread] = None
+
+_segment = 0
+_segment_bytes = 0
+_handles: Dict[int, Any] = {}   # segment -> open file (holds the flock)
+_pending: Dict[int, int] = {}   # segment -> rows not in the DB yet
+_atexit_registered = False
+
+
+def spool_dir(app) -> str:
+    folder = app.config.get("AUDIT_SPOOL_DIR") or os.path.join(os.path.abspath(os.path.join(app.root_path, "..")), "audit_spool")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _segment_path(segment: int) -> str:
+    return os.path.join(spool_dir(_app), f"audit-{os.getpid()}-{segment:06d}.jsonl")
+
+
+def _encode(row: Dict[str, Any]) -> str:
+    created_at = row.get("created_at")
+    if isinstance(created_at, datetime):
+        row = {**row, "created_at": created_at.isoformat()}
+    return json.dumps(row, default=str)
+
+
+def _decode(line: str) -> Dict[str, Any]:
+    row = json.loads(line)
+    try:
+        row["created_at"] = datetime.fromisoformat(row["created_at"])
+    except (KeyError, TypeError, ValueError):
+        row["created_at"] = datetime.utcnow()
+    return row
+
+
+# ---------------- Producer side ----------------
+
+def _reset_after_fork() -> None:
+    # Threads and flocks don't belong to a forked child: start clean
+    global _pid, _queue, _thread, _segment, _segment_bytes, _handles, _pending
+    _pid = os.getpid()
+    _queue = queue.Queue()
+    _thread = None
+    _segment, _segment_bytes = 0, 0
+    _handles, _pending = {}, {}
+
+
+def _open_segment():
+    global _segment, _segment_bytes
+    fh = _handles.get(_segment)
+    max_bytes = int(_app.config.get("AUDIT_SPOOL_MAX_BYTES", 16 * 1024 * 1024))
+    if fh is not None and _segment_bytes >= max_bytes:
+        # Rotate: the old segment stays open (and locked) until drained
+        _segment += 1
+        _segment_bytes = 0
+        fh = None
+    if fh is None:
+        fh = open(_segment_path(_segment), "a", encoding="utf-8")
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        _handles[_segment] = fh
+    return fh
+
+
+def enqueue(rows: List[Dict[str, Any]]) -> None:
+    """Spools committed audit rows and hands them to the background writer."""
+    global _segment_bytes
+    if not rows:
+        return
+    data = "".join(_encode(row) + "\n" for row in rows)
+    with _lock:
+        if _pid != os.getpid():
+            _reset_after_fork()
+        try:
+            fh = _open_segment()
+            fh.write(data)
+            fh.flush()
+            if _app.config.get("AUDIT_SPOOL_FSYNC"):
+                os.fsync(fh.fileno())
+            segment = _segment
+            _segment_bytes += len(data)
+        except Exception as e:
+            # No spool (disk full, read-only FS): still try the DB write
+            _app.logger.warning(f"AUDIT spool write failed: {e}")
+            segment = -1
+        _pending[segment] = _pending.get(segment, 0) + len(rows)
+        _ensure_thread()
+    _queue.put((segment, rows))
+
+
+def _done(segment: int, count: int) -> None:
+    global _segment_bytes
+    with _lock:
+        left = _pending.get(segment, 0) - count
+        if left > 0:
+            _pending[segment] = left
+            return
+        _pending.pop(segment, None)
+        fh = _handles.get(segment)
+        if fh is None:
+            return
+        try:
+            if segment == _segment:
+                fh.seek(0)
+                fh.truncate()
+                _segment_bytes = 0
+            else:
+                _handles.pop(segment, None)
+                os.remove(fh.name)
+                fh.close()
+        except OSError:
+            pass
+
+
+# ---------------- Background writer ----------------
+
+def _ensure_thread() -> None:
+    # Started lazily (under _lock) so gunicorn forks before any thread exists
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(target=_worker, name="audit-sink", daemon=True)
+        _thread.start()
+
+
+def _insert(rows: List[Dict[str, Any]]) -> None:
+    from app.audit import insert_audit_rows
+
+    with _app.app_context():
+        with db.engine.begin() as connection:
+            insert_audit_rows(connection, rows)
+
+
+def _insert_with_retry(rows: List[Dict[str, Any]]) -> bool:
+    attempts = max(1, int(_app.config.get("AUDIT_MAX_ATTEMPTS", 5)))
+    for attempt in range(1, attempts + 1):
+        try:
+            _insert(rows)
+            return True
+        except Exception as e:
+            _app.logger.warning(f"AUDIT insert of {len(rows)} rows failed (attempt {attempt}/{attempts}): {e}")
+            if attempt < attempts:
+                time.sleep(min(30.0, 0.5 * 2 ** attempt))
+    return False
+
+
+def _next_batch(q: "queue.Queue", batch_size: int, interval: float) -> List[Tuple[int, List[Dict[str, Any]]]]:
+    items = [q.get()]
+    size = len(items[0][1])
+    deadline = time.monotonic() + interval
+    while size < batch_size:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            break
+        try:
+            item = q.get(timeout=timeout)
+        except queue.Empty:
+            break
+        items.append(item)
+        size += len(item[1])
+    return items
+
+
+def _dead_letter(rows: List[Dict[str, Any]]) -> bool:
+    """Writes a failed batch to its own file for the next startup replay."""
+    path = os.path.join(spool_dir(_app), f"audit-dead-{os.getpid()}-{time.time_ns()}.jsonl")
+    try:
+        # Written under a name replay ignores, then renamed: never half-read
+        with open(path + ".tmp", "w", encoding="utf-8") as fh:
+            fh.write("".join(_encode(row) + "\n" for row in rows))
+            fh.flush()
+            if _app.config.get("AUDIT_SPOOL_FSYNC"):
+                os.fsync(fh.fileno())
+        os.replace(path + ".tmp", path)
+        return True
+    except OSError as e:
+        _app.logger.error(f"AUDIT dead-letter write failed: {e}")
+        return False
+
+
+def _worker() -> None:
+    q = _queue
+    batch_size = int(_app.config.get("AUDIT_BATCH_SIZE", 500))
+    interval = float(_app.config.get("AUDIT_FLUSH_INTERVAL", 0.5))
+    while True:
+        items = _next_batch(q, batch_size, interval)
+        rows = [row for _segment, chunk in items for row in chunk]
+        if _insert_with_retry(rows) or _dead_letter(rows):
+            per_segment: Counter = Counter()
+            for segment, chunk in items:
+                per_segment[segment] += len(chunk)
+            for segment, count in per_segment.items():
+                _done(segment, count)
+        else:
+            # No dead-letter file either: the segments keep them for replay
+            _app.logger.error(f"AUDIT giving up on {len(rows)} rows; they stay in the spool for replay")
+        for _ in items:
+            q.task_done()
+
+
+def flush(timeout: float = 10.0) -> bool:
+    """Waits until everything queued so far is written (tests, shutdown)."""
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks:
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+# ---------------- Startup replay ----------------
+
+def _owner_alive(path: str, fh) -> bool:
+    if fcntl is not None:
+        try:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        # Got the lock after another replayer already removed it: not ours either
+        return os.fstat(fh.fileno()).st_nlink == 0
+    try:
+        pid = int(os.path.basename(path).split("-")[1])
+        if pid == os.getpid():
+            return True
+        os.kill(pid, 0)
+        return True
+    except (ValueError, IndexError, OSError):
+        return False
+
+
+def replay_spool(app) -> int:
+    """Inserts rows from spool segments whose process is gone. Returns the row count."""
+    from app.audit import insert_audit_rows
+
+    batch_size = int(app.config.get("AUDIT_BATCH_SIZE", 500))
+    replayed = 0
+    for path in sorted(glob.glob(os.path.join(spool_dir(app), "audit-*.jsonl"))):
+        try:
+            fh = open(path, "r+", encoding="utf-8")
+        except OSError:
+            continue
+        try:
+            if _owner_alive(path, fh):
+                continue
+            rows = []
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(_decode(line))
+                except ValueError:
+                    continue  # torn last line from a crash
+            with app.app_context():
+                with db.engine.begin() as connection:
+                    for i in range(0, len(rows), batch_size):
+                        insert_audit_rows(connection, rows[i:i + batch_size])
+            os.remove(path)
+            replayed += len(rows)
+        except Exception as e:
+            app.logger.warning(f"AUDIT spool replay of {os.path.basename(path)} failed: {e}")
+        finally:
+            fh.close()
+    return replayed
+
+
+def init_audit_sink(app) -> None:
+    global _app, _atexit_registered
+    _app = app
+    with _lock:
+        if _pid != os.getpid():
+            _reset_after_fork()
+
+    # Normal shutdown: give the writer a moment so the next start has less to replay
+    if not _atexit_registered:
+        atexit.register(flush, 5.0)
+        _atexit_registered = True
+
+    try:
+        replayed = replay_spool(app)
+        if replayed:
+            app.logger.info(f"AUDIT replayed {replayed} spooled rows")
+    except Exception as e:
+        app.logger.warning(f"AUDIT spool replay skipped: {e}")
@@ -0,0 +1,203 @@
+"""
+Audit trail viewer queries.
+
+Newest first, keyset-paginated on (created_at, id). Every filter is an
+equality on the leading column of one of the audit_logs composite indexes
+(entity_type + entity_id, actor_user_id, action) followed by the
+(created_at, id) keyset, and the date range is a range on created_at, so
+page 1000 costs the same as page 1.
+
+The per-entity timeline (entity_timeline) uses the same keyset over the
+entity and its related children, then continues into the cold archive.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, literal, or_, select, tuple_, union_all
+
+from app.extensions import db
+from app.models.audit_log import AuditLog
+from app.models.payment import Payment
+from app.models.procurement_quotation import ProcurementQuotation
+from app.pagination import clamp_per_page, decode_cursor, encode_cursor, keyset_page
+
+AUDIT_KEY = [AuditLog.created_at, AuditLog.id]
+ACTIONS = ("create", "update", "delete")
+
+AuditFilters = namedtuple(
+    "AuditFilters",
+    ["entity_type", "entity_id", "actor_user_id", "action", "start_dt", "end_dt"],
+)
+
+
+def _parse_day(raw: Any) -> Optional[datetime]:
+    try:
+        return datetime.strptime(raw, "%Y-%m-%d") if raw else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_audit_filters(args: Mapping[str, Any]) -> AuditFilters:
+    """?entity_type=&entity_id=&actor_user_id=&action=&start_date=&end_date= (bad values are ignored)."""
+    try:
+        actor_user_id = int(args.get("actor_user_id")) if args.get("actor_user_id") else None
+    except (TypeError, ValueError):
+        actor_user_id = None
+
+    end_dt = _parse_day(args.get("end_date"))
+    if end_dt is not None:
+        end_dt = end_dt + timedelta(days=1) - timedelta(microseconds=1)  # end date inclusive
+
+    return AuditFilters(
+        entity_type=(args.get("entity_type") or "").strip() or None,
+        entity_id=(args.get("entity_id") or "").strip() or None,
+        actor_user_id=actor_user_id,
+        action=(args.get("action") or "").strip() or None,
+        start_dt=_parse_day(args.get("start_date")),
+        end_dt=end_dt,
+    )
+
+
+def filter_args(filters: AuditFilters) -> Dict[str, Any]:
+    """Filters back as query-string args (for pagination / export links)."""
+    args = {
+        "entity_type": filters.entity_type,
+        "entity_id": filters.entity_id,
+        "actor_user_id": filters.actor_user_id,
+        "action": filters.action,
+        "start_date": filters.start_dt.date().isoformat() if filters.start_dt else None,
+        "end_date": filters.end_dt.date().isoformat() if filters.end_dt else None,
+    }
+    return {k: v for k, v in args.items() if v is not None}
+
+
+def audit_query(filters: AuditFilters):
+    query = AuditLog.query
+    if filters.entity_type:
+        query = query.filter(AuditLog.entity_type == filters.entity_type)
+    if filters.entity_id:
+        query = query.filter(AuditLog.entity_id == filters.entity_id)
+    if filters.actor_user_id is not None:
+        query = query.filter(AuditLog.actor_user_id == filters.actor_user_id)
+    if filters.action:
+        query = query.filter(AuditLog.action == filters.action)
+    if filters.start_dt is not None:
+        query = query.filter(AuditLog.created_at >= filters.start_dt)
+    if filters.end_dt is not None:
+        query = query.filter(AuditLog.created_at <= filters.end_dt)
+    return query
+
+
+def audit_page(filters: AuditFilters, cursor: Optional[str], raw_per_page=None) -> Tuple[List[AuditLog], Optional[str], int]:
+    """Returns (rows, next_cursor, per_page) for one page of the audit trail."""
+    per_page = clamp_per_page(
+        raw_per_page,
+        current_app.config.get("AUDIT_PAGE_SIZE", 50),
+        current_app.config.get("AUDIT_PAGE_SIZE_MAX", 200),
+    )
+    rows, next_cursor = keyset_page(audit_query(filters), AUDIT_KEY, cursor, per_page)
+    return rows, next_cursor, per_page
+
+
+# ---------------- Entity timeline ----------------
+
+# Child entities whose events belong on the parent's timeline:
+# parent type -> (child type, child model, FK column to the parent)
+RELATED = {
+    "ProcurementRequest": (
+        ("Payment", Payment, Payment.procurement_request_id),
+        ("ProcurementQuotation", ProcurementQuotation, ProcurementQuotation.procurement_request_id),
+    ),
+}
+
+
+def timeline_entities(entity_type: str, entity_id: str) -> List[Tuple[str, str]]:
+    """(entity_type, entity_id) pairs on this entity's timeline: itself + related children (one query)."""
+    keys = [(entity_type, str(entity_id))]
+    related = RELATED.get(entity_type)
+    if related and str(entity_id).isdigit():
+        stmt = union_all(
+            *[select(literal(name), model.id).where(fk == int(entity_id)) for name, model, fk in related]
+        )
+        keys += [(name, str(child_id)) for name, child_id in db.session.execute(stmt)]
+    return keys
+
+
+def timeline_query(keys: Sequence[Tuple[str, str]]):
+    """
+    Audit rows of all `keys`, grouped into one IN list per type. Each branch
+    is an ix_audit_logs_entity range, so the cost follows the number of
+    matching events, not the table size.
+    """
+    by_type: Dict[str, List[str]] = defaultdict(list)
+    for entity_type, entity_id in keys:
+        by_type[entity_type].append(entity_id)
+    return AuditLog.query.filter(
+        or_(*[and_(AuditLog.entity_type == t, AuditLog.entity_id.in_(ids)) for t, ids in by_type.items()])
+    )
+
+
+def _archived_page(keys, after, limit: int, folder: Optional[str]) -> List[Dict[str, Any]]:
+    """Up to `limit` archived events older than the `after` key, newest first."""
+    if not folder:
+        return []
+    from app.audit_archive import iter_archived_events
+
+    events = []
+    for row in iter_archived_events(keys, folder):
+        created = row.get("created_at")
+        if created is None:
+            continue
+        if after is not None and (created, row.get("id") or 0) >= tuple(after):
+            continue
+        row["archived"] = True
+        events.append(row)
+    events.sort(key=lambda r: (r["created_at"], r.get("id") or 0), reverse=True)
+    return events[:limit]
+
+
+def entity_timeline(
+    entity_type: str,
+    entity_id: str,
+    cursor: Optional[str],
+    raw_per_page=None,
+    archive_folder: Optional[str] = None,
+) -> Tuple[list, Optional[str], int, List[Tuple[str, str]]]:
+    """
+    One page of an entity's history (newest first) incl. related children.
+    Hot rows come from audit_logs; once those run out the page continues
+    into the cold archive (app/audit_archive.py), which only holds older
+    months. Returns (events, next_cursor, per_page, keys).
+    """
+    per_page = clamp_per_page(
+        raw_per_page,
+        current_app.config.get("AUDIT_PAGE_SIZE", 50),
+        current_app.config.get("AUDIT_PAGE_SIZE_MAX", 200),
+    )
+    keys = timeline_entities(entity_type, entity_id)
+    after = decode_cursor(cursor, len(AUDIT_KEY))
+
+    query = timeline_query(keys)
+    if after is not None:
+        query = query.filter(tuple_(*AUDIT_KEY) < tuple_(*after))
+    events: list = query.order_by(*[c.desc() for c in AUDIT_KEY]).limit(per_page + 1).all()
+
+    if len(events) <= per_page:
+        last = events[-1] if events else None
+        archive_after = [last.created_at, last.id] if last is not None else after
+        events += _archived_page(keys, archive_after, per_page + 1 - len(events), archive_folder)
+
+    next_cursor = None
+    if len(events) > per_page:
+        events = events[:per_page]
+        last = events[-1]
+        if isinstance(last, dict):
+            next_cursor = encode_cursor([last["created_at"], last.get("id") or 0])
+        else:
+            next_cursor = encode_cursor([last.created_at, last.id])
+    return events, next_cursor, per_page, keys
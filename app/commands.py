@@ -0,0 +1,179 @@
+"""
+Maintenance CLI commands (run with `flask <command>`).
+"""
+
+import click
+
+from app.extensions import db
+
+
+def register_commands(app) -> None:
+    @app.cli.command("rebuild-summaries")
+    def rebuild_summaries_cmd():
+        """Backfill/rebuild the per-request summary columns."""
+        from app.summaries import refresh_summaries
+
+        refresh_summaries(db.session.connection())
+        db.session.commit()
+        click.echo("✅ Request summaries rebuilt")
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index_cmd():
+        """Create (if missing) and backfill the procurement full-text index."""
+        from app.search import ensure_search_schema, reindex_requests
+
+        connection = db.session.connection()
+        backend = ensure_search_schema(connection)
+        if backend is None:
+            click.echo(f"⚠️ Full-text search not supported on {connection.dialect.name}")
+            return
+        reindex_requests(connection)
+        db.session.commit()
+        click.echo(f"✅ Search index rebuilt ({backend})")
+
+    @app.cli.command("retry-uploads")
+    def retry_uploads_cmd():
+        """Upload every pending/failed quotation and receipt from the spool."""
+        from app.uploads import retry_pending_uploads
+
+        ok, failed = retry_pending_uploads()
+        click.echo(f"✅ Uploaded {ok} file(s), {failed} still failing")
+
+    @app.cli.command("gc-blobs")
+    @click.option("--grace-hours", default=24.0, show_default=True, help="Only delete blobs older than this.")
+    def gc_blobs_cmd(grace_hours):
+        """Delete stored files no quotation/payment/document references any more."""
+        from app.uploads import gc_blobs
+
+        deleted, freed = gc_blobs(grace_hours)
+        click.echo(f"✅ Deleted {deleted} unreferenced blob(s), freed {freed} bytes")
+
+    @app.cli.command("import-requests")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--batch-size", default=None, type=int, help="Rows per insert transaction.")
+    def import_requests_cmd(path, batch_size):
+        """Bulk-import procurement requests from an .xlsx or .csv file."""
+        from app.importer import import_requests
+
+        with open(path, "rb") as fh:
+            report = import_requests(fh, path, batch_size=batch_size)
+
+        for line, error in report.errors:
+            click.echo(f"row {line}: {error}", err=True)
+        click.echo(
+            f"✅ Imported {report.inserted}/{report.total_rows} row(s) "
+            f"in {report.seconds:.2f}s ({report.failed} failed)"
+        )
+
+    @app.cli.command("purge-idempotency-keys")
+    def purge_idempotency_keys_cmd():
+        """Delete expired payment idempotency keys."""
+        from app.idempotency import purge_expired_keys
+
+        click.echo(f"✅ Deleted {purge_expired_keys()} expired idempotency key(s)")
+
+    @app.cli.command("rebuild-rollups")
+    def rebuild_rollups_cmd():
+        """Backfill/rebuild the report rollup tables from raw data."""
+        from app.rollups import rebuild_rollups
+
+        rebuild_rollups(db.session.connection())
+        db.session.commit()
+        click.echo("✅ Report rollups rebuilt")
+
+    @app.cli.command("audit-partitions")
+    @click.option("--months-ahead", default=2, show_default=True, help="Future monthly partitions to keep ready.")
+    def audit_partitions_cmd(months_ahead):
+        """Create upcoming monthly audit_logs partitions (Postgres)."""
+        from app.audit_archive import ensure_partitions, is_partitioned
+
+        connection = db.session.connection()
+        if not is_partitioned(connection):
+            click.echo("⚠️ audit_logs is not partitioned on this database (nothing to do)")
+            return
+        created = ensure_partitions(connection, months_ahead)
+        db.session.commit()
+        click.echo(f"✅ Audit partitions ready ({', '.join(created) or 'none new'})")
+
+    @app.cli.command("archive-audit")
+    @click.option("--keep-months", default=None, type=int, help="Months kept in audit_logs, incl. the current one.")
+    @click.option("--dry-run", is_flag=True, help="Only list the months that would be archived.")
+    def archive_audit_cmd(keep_months, dry_run):
+        """Move closed months of audit_logs to compressed JSONL archive files."""
+        from flask import current_app
+
+        from app.audit_archive import archive_dir, archive_month, closed_months, ensure_partitions, month_label
+
+        keep = keep_months or int(current_app.config.get("AUDIT_HOT_MONTHS", 3))
+        folder = archive_dir(current_app)
+        months = closed_months(db.session.connection(), keep)
+        if dry_run:
+            click.echo(f"Would archive: {', '.join(month_label(m) for m in months) or 'nothing'}")
+            return
+
+        total = 0
+        for month in months:
+            try:
+                rows, how = archive_month(db.session.connection(), month, folder)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                click.echo(f"❌ {month_label(month)}: {e}", err=True)
+                continue
+            total += rows
+            click.echo(f"  {month_label(month)}: {rows} row(s) archived ({how or 'nothing left'})")
+
+        ensure_partitions(db.session.connection())
+        db.session.commit()
+        click.echo(f"✅ Archived {total} audit row(s) to {folder}")
+
+    @app.cli.command("bench-exports")
+    @click.option("--rows", default=100_000, show_default=True, help="Synthetic payment rows to export.")
+    @click.option("--db", "from_db", is_flag=True, help="Export real payments (all time) instead of synthetic rows.")
+    def bench_exports_cmd(rows, from_db):
+        """Compare CSV vs XLSX export: wall time, peak Python memory, file size."""
+        import csv
+        import os
+        import tempfile
+        import time
+        import tracemalloc
+        from datetime import datetime, timedelta
+        from decimal import Decimal
+
+        from app.exports import write_xlsx
+        from app.report_engine import PAYMENT_EXPORT_HEADER, ReportFilters, iter_payment_export_rows
+
+        def source():
+            if from_db:
+                return iter_payment_export_rows(ReportFilters(datetime(1970, 1, 1), datetime.utcnow(), "all"))
+            start = datetime(2024, 1, 1)
+            return (
+                [i, i // 3, Decimal("12500.50"), "finance", "Jane Doe", start + timedelta(minutes=i), None]
+                for i in range(rows)
+            )
+
+        def to_csv(path):
+            with open(path, "w", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(PAYMENT_EXPORT_HEADER)
+                writer.writerows(source())
+
+        def to_xlsx(path):
+            write_xlsx(path, "Payments", PAYMENT_EXPORT_HEADER, source())
+
+        for label, fn, suffix in (("csv", to_csv, ".csv"), ("xlsx", to_xlsx, ".xlsx")):
+            fd, path = tempfile.mkstemp(suffix=suffix)
+            os.close(fd)
+            try:
+                tracemalloc.start()
+                started = time.perf_counter()
+                fn(path)
+                seconds = time.perf_counter() - started
+                _current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                click.echo(
+                    f"{label:5} {seconds:8.2f}s  peak {peak / 1_048_576:7.1f} MiB  "
+                    f"file {os.path.getsize(path) / 1_048_576:7.1f} MiB"
+                )
+            finally:
+                os.remove(path)
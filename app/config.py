@@ -11,3 +11,72 @@ class Config:
     )
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Procurement list (keyset paginated)
+    PROCUREMENT_PAGE_SIZE = int(os.environ.get("PROCUREMENT_PAGE_SIZE", "50"))
+    PROCUREMENT_PAGE_SIZE_MAX = int(os.environ.get("PROCUREMENT_PAGE_SIZE_MAX", "200"))
+    WORK_QUEUE_PAGE_SIZE = int(os.environ.get("WORK_QUEUE_PAGE_SIZE", "25"))
+    WORK_QUEUE_PAGE_SIZE_MAX = int(os.environ.get("WORK_QUEUE_PAGE_SIZE_MAX", "100"))
+    AUDIT_PAGE_SIZE = int(os.environ.get("AUDIT_PAGE_SIZE", "50"))
+    AUDIT_PAGE_SIZE_MAX = int(os.environ.get("AUDIT_PAGE_SIZE_MAX", "200"))
+
+    # Logged-in user cache (per process; seconds a change made in another worker may take to apply)
+    USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "30"))
+
+    # Seconds between checks for a search index created by another process (app/search.py)
+    SEARCH_INDEX_RECHECK = float(os.environ.get("SEARCH_INDEX_RECHECK", "30"))
+
+    # Vendor catalog cache (per process; events invalidate locally, TTL covers other workers)
+    VENDOR_CACHE_TTL = int(os.environ.get("VENDOR_CACHE_TTL", "60"))
+
+    # Quotation/receipt uploads: spooled locally, pushed by a background pool
+    UPLOAD_BACKEND = os.environ.get("UPLOAD_BACKEND") or (
+        "cloudinary"
+        if os.environ.get("CLOUDINARY_URL") or os.environ.get("CLOUDINARY_CLOUD_NAME")
+        else "local"
+    )
+    UPLOAD_SPOOL_DIR = os.environ.get("UPLOAD_SPOOL_DIR")  # default: uploads/spool
+    UPLOAD_LOCAL_STORE_DIR = os.environ.get("UPLOAD_LOCAL_STORE_DIR")  # default: uploads/store
+    UPLOAD_WORKERS = int(os.environ.get("UPLOAD_WORKERS", "2"))
+    UPLOAD_MAX_ATTEMPTS = int(os.environ.get("UPLOAD_MAX_ATTEMPTS", "5"))
+    UPLOAD_RETRY_BACKOFF = float(os.environ.get("UPLOAD_RETRY_BACKOFF", "2.0"))
+    UPLOAD_SYNC = os.environ.get("UPLOAD_SYNC", "").lower() in ("1", "true", "yes")  # run inline (tests/debug)
+
+    # Bulk request import (rows per executemany transaction)
+    IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "1000"))
+
+    # Payment form idempotency keys (replayed POSTs return the first result)
+    IDEMPOTENCY_KEY_TTL_HOURS = float(os.environ.get("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+    # Dashboard KPI snapshot max age (cross-worker safety net)
+    KPI_CACHE_TTL = float(os.environ.get("KPI_CACHE_TTL", "30"))
+
+    # Report exports: rows fetched per server-side cursor batch / flushed per chunk
+    EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "1000"))
+    EXPORT_TMP_DIR = os.environ.get("EXPORT_TMP_DIR") or None  # XLSX temp files (None = system temp)
+
+    # Audit writes: "sync" (inside the business transaction) or "async"
+    # (spooled to AUDIT_SPOOL_DIR on commit, inserted by a background thread)
+    AUDIT_MODE = os.environ.get("AUDIT_MODE", "sync")
+    AUDIT_SPOOL_DIR = os.environ.get("AUDIT_SPOOL_DIR")  # default: audit_spool/
+    AUDIT_SPOOL_FSYNC = os.environ.get("AUDIT_SPOOL_FSYNC", "").lower() in ("1", "true", "yes")
+    AUDIT_SPOOL_MAX_BYTES = int(os.environ.get("AUDIT_SPOOL_MAX_BYTES", str(16 * 1024 * 1024)))
+    AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", "500"))
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get("AUDIT_FLUSH_INTERVAL", "0.5"))  # seconds to gather a batch
+    AUDIT_MAX_ATTEMPTS = int(os.environ.get("AUDIT_MAX_ATTEMPTS", "5"))
+
+    # Audit retention: months kept in audit_logs, older ones go to gzip JSONL
+    AUDIT_HOT_MONTHS = int(os.environ.get("AUDIT_HOT_MONTHS", "3"))
+    AUDIT_ARCHIVE_DIR = os.environ.get("AUDIT_ARCHIVE_DIR")  # default: audit_archive/
+
+    # /reports payload cache (LRU entries per process) + data version refresh
+    REPORT_CACHE_SIZE = int(os.environ.get("REPORT_CACHE_SIZE", "128"))
+    REPORT_VERSION_TTL = float(os.environ.get("REPORT_VERSION_TTL", "5"))  # seconds other workers' writes may go unseen
+
+    # Background PDF reports (cached on disk by filters + data version)
+    PDF_REPORT_DIR = os.environ.get("PDF_REPORT_DIR")  # default: reports_cache/
+    PDF_REPORT_WORKERS = int(os.environ.get("PDF_REPORT_WORKERS", "1"))
+    PDF_REPORT_RETENTION_DAYS = float(os.environ.get("PDF_REPORT_RETENTION_DAYS", "7"))
+    PDF_REPORT_TIMEOUT = float(os.environ.get("PDF_REPORT_TIMEOUT", "600"))  # stale "running" jobs count as failed
+    PDF_REPORT_MAX_DETAIL_ROWS = int(os.environ.get("PDF_REPORT_MAX_DETAIL_ROWS", "5000"))
+    PDF_REPORT_SYNC = os.environ.get("PDF_REPORT_SYNC", "").lower() in ("1", "true", "yes")  # run inline (tests/debug)
@@ -0,0 +1,154 @@
+"""
+Data watermarks for cached report output.
+
+`data_versions.version` for "reports" is bumped after any transaction that
+writes procurement requests, payments or vendors commits, so a cache key
+built from (filters, version) changes whenever report data may have
+changed. after_flush only flags the session; the bump itself is a single
+upsert on its own short connection in after_commit, so writers never hold
+the data_versions row lock across their business transaction. Core writes
+that skip the ORM call mark_data_changed().
+
+cached_data_version() is the cheap read for hot paths (report ETags): a
+per-process copy refreshed every REPORT_VERSION_TTL seconds, dropped as soon
+as this process commits a bump. Writes from other workers show up within
+the TTL.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Tuple
+
+from flask import current_app
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.data_version import DataVersion
+from app.models.payment import Payment
+from app.models.procurement_request import ProcurementRequest
+from app.models.vendor import Vendor
+
+REPORTS = "reports"
+REPORT_MODELS = (ProcurementRequest, Payment, Vendor)
+
+_lock = threading.Lock()
+_cached: Dict[str, Tuple[int, float]] = {}
+_generation = 0
+_ttl = 5.0
+
+
+def _upsert_version(connection, name: str) -> None:
+    table = DataVersion.__table__
+    now = datetime.utcnow()
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table).values(name=name, version=1, updated_at=now)
+        connection.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.c.name],
+                set_={"version": table.c.version + 1, "updated_at": now},
+            )
+        )
+        return
+
+    result = connection.execute(
+        update(table).where(table.c.name == name).values(version=table.c.version + 1, updated_at=now)
+    )
+    if not result.rowcount:
+        try:
+            with connection.begin_nested():
+                connection.execute(insert(table).values(name=name, version=1, updated_at=now))
+        except IntegrityError:
+            # Another writer created the row first: bump theirs
+            connection.execute(
+                update(table).where(table.c.name == name).values(version=table.c.version + 1, updated_at=now)
+            )
+
+
+def bump_data_version(name: str = REPORTS, bind=None) -> None:
+    """Bumps `name` in its own short transaction (never inside a business transaction)."""
+    try:
+        with (bind or db.engine).begin() as connection:
+            _upsert_version(connection, name)
+    except Exception:
+        # Worst case a cached report lives until the next bump / restart
+        current_app.logger.exception("data_versions bump failed")
+    invalidate_cached_versions()
+
+
+def mark_data_changed(session=None) -> None:
+    """Flags the current transaction: the version is bumped once it commits."""
+    (session or db.session).info["data_version_dirty"] = True
+
+
+def get_data_version(name: str = REPORTS) -> int:
+    table = DataVersion.__table__
+    value = db.session.execute(select(table.c.version).where(table.c.name == name)).scalar()
+    return int(value or 0)
+
+
+def cached_data_version(name: str = REPORTS) -> int:
+    """get_data_version(), served from memory for up to REPORT_VERSION_TTL seconds."""
+    now = time.monotonic()
+    with _lock:
+        hit = _cached.get(name)
+        if hit is not None and now - hit[1] < _ttl:
+            return hit[0]
+        generation = _generation
+
+    version = get_data_version(name)
+    with _lock:
+        # A commit landed while we were reading: don't cache a maybe-old value
+        if generation == _generation:
+            _cached[name] = (version, now)
+    return version
+
+
+def invalidate_cached_versions() -> None:
+    global _generation
+    with _lock:
+        _cached.clear()
+        _generation += 1
+
+
+def _after_flush(session, flush_context):
+    if session.info.get("data_version_dirty"):
+        return
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, REPORT_MODELS) and (obj not in session.dirty or session.is_modified(obj)):
+            mark_data_changed(session)
+            return
+
+
+def _after_commit(session):
+    # Also fires on savepoint release: wait for the real commit
+    if session.get_nested_transaction() is not None:
+        return
+    if session.info.pop("data_version_dirty", None):
+        bump_data_version(bind=session.get_bind())
+
+
+def _after_soft_rollback(session, previous_transaction):
+    # Rolled-back writes never happened. A rolled-back savepoint (or a flush
+    # failing inside one) keeps the flag: an extra bump is harmless, a missed
+    # one is not.
+    if previous_transaction.parent is None:
+        session.info.pop("data_version_dirty", None)
+
+
+def init_data_version(app) -> None:
+    global _ttl
+    _ttl = float(app.config.get("REPORT_VERSION_TTL", 5))
+
+    if not event.contains(db.session, "after_flush", _after_flush):
+        event.listen(db.session, "after_flush", _after_flush)
+        event.listen(db.session, "after_commit", _after_commit)
+        event.listen(db.session, "after_soft_rollback", _after_soft_rollback)
@@ -7,8 +7,9 @@ migrate = Migrate()
 login_manager = LoginManager()
 
 login_manager.login_view = "auth.login"
-from app.models.user import User
+from app.user_cache import load_cached_user
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Cached, read-only user record (see app/user_cache.py)
+    return load_cached_user(user_id)
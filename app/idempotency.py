@@ -0,0 +1,109 @@
+"""
+Idempotency keys for non-repeatable form POSTs (payments).
+
+Every payment form carries a hidden `idempotency_key` token, minted per
+render. The key row is inserted in the same transaction as the Payment:
+
+  - replay after the first commit  -> lookup finds it, the original
+    result is flashed again, nothing is spooled, inserted or uploaded
+  - replay racing the first request -> the unique index makes the second
+    commit fail; it rolls back and reports the winner's result
+  - first request failed / rolled back -> no key row, a retry runs normally
+
+Keys expire after IDEMPOTENCY_KEY_TTL_HOURS; `flask purge-idempotency-keys`
+deletes old rows.
+"""
+
+from __future__ import annotations
+
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional
+
+from flask import current_app, flash, request
+from flask_login import current_user
+
+from app.extensions import db
+from app.models.idempotency_key import IdempotencyKey
+
+FORM_FIELD = "idempotency_key"
+MAX_KEY_LENGTH = 64
+
+
+def new_token() -> str:
+    return secrets.token_urlsafe(24)
+
+
+def _ttl() -> timedelta:
+    return timedelta(hours=float(current_app.config.get("IDEMPOTENCY_KEY_TTL_HOURS", 24)))
+
+
+def request_key() -> Optional[str]:
+    """The submitted token, or None (old form / API client: no protection)."""
+    key = (request.form.get(FORM_FIELD) or "").strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return None
+    return key
+
+
+def find_key(key: Optional[str], scope: str) -> Optional[IdempotencyKey]:
+    """Returns the live key row for a replayed submit, dropping an expired one."""
+    if not key:
+        return None
+    row = IdempotencyKey.query.filter_by(key=key).first()
+    if row is None:
+        return None
+    if row.expires_at <= datetime.utcnow():
+        # Expired: free the key so this submit is treated as new
+        db.session.delete(row)
+        db.session.commit()
+        return None
+    if row.scope != scope:
+        return None
+    return row
+
+
+def record_key(key: Optional[str], scope: str, payment=None, message: str = "", category: str = "success") -> None:
+    """Adds the key row to the current transaction (commit it with the write)."""
+    if not key:
+        return
+    now = datetime.utcnow()
+    row = IdempotencyKey(
+        key=key,
+        scope=scope,
+        user_id=getattr(current_user, "id", None),
+        result_message=message[:255] or None,
+        result_category=category,
+        created_at=now,
+        expires_at=now + _ttl(),
+    )
+    if payment is not None:
+        db.session.flush()  # assigns payment.id
+        row.payment_id = payment.id
+    db.session.add(row)
+
+
+def replay_result(key: Optional[str], scope: str) -> bool:
+    """Flashes the original outcome of a duplicate submit. True if it was one."""
+    row = find_key(key, scope)
+    if row is None:
+        return False
+    if row.result_message:
+        flash(row.result_message, row.result_category or "success")
+    flash("Duplicate submit ignored — this payment was already recorded.", "info")
+    return True
+
+
+def purge_expired_keys(now: Optional[datetime] = None) -> int:
+    deleted = IdempotencyKey.query.filter(IdempotencyKey.expires_at <= (now or datetime.utcnow())).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+    return int(deleted or 0)
+
+
+def init_idempotency(app) -> None:
+    # {{ idempotency_token() }} in templates -> fresh token per form render
+    @app.context_processor
+    def _idempotency_token():
+        return {"idempotency_token": new_token}
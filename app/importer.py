@@ -0,0 +1,300 @@
+"""
+Bulk procurement request import from XLSX / CSV.
+
+Rows are streamed (openpyxl read-only mode, or csv), validated the same way
+procurement.create() validates a single request, and inserted in batched
+executemany transactions. Vendors are resolved by name from one catalog
+lookup. Produces a per-row error report; bad rows never block good ones (a
+batch the database refuses is split until only the failing rows are left).
+
+Expected header (case-insensitive, order free):
+    item, description, quantity, amount, vendor, is_urgent
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models.procurement_request import ProcurementRequest
+
+HEADER_ALIASES = {
+    "item": "item",
+    "item name": "item",
+    "description": "description",
+    "quantity": "quantity",
+    "qty": "quantity",
+    "amount": "amount",
+    "vendor": "vendor",
+    "vendor name": "vendor",
+    "is_urgent": "is_urgent",
+    "urgent": "is_urgent",
+}
+REQUIRED_COLUMNS = ("item", "quantity", "amount", "vendor")
+TRUTHY = {"1", "y", "yes", "true", "x", "on", "urgent"}
+
+# Limits of the procurement_requests columns, checked before the INSERT so a
+# row the DB would refuse is reported on its own line
+_COLUMNS = ProcurementRequest.__table__.c
+AMOUNT_STEP = Decimal(1).scaleb(-_COLUMNS.amount.type.scale)  # 0.01
+AMOUNT_LIMIT = Decimal(10) ** (_COLUMNS.amount.type.precision - _COLUMNS.amount.type.scale)
+MAX_QUANTITY = 2**31 - 1  # INTEGER
+MAX_ITEM_LENGTH = _COLUMNS.item.type.length
+
+
+class ImportReport:
+    def __init__(self) -> None:
+        self.total_rows = 0
+        self.inserted = 0
+        self.errors: List[Tuple[int, str]] = []  # (spreadsheet row number, message)
+        self.started = datetime.utcnow()
+        self.seconds = 0.0
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_rows": self.total_rows,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "seconds": round(self.seconds, 2),
+            "errors": [{"row": r, "error": e} for r, e in self.errors],
+        }
+
+
+# ---------------- Validation (shared with procurement.create) ----------------
+
+def parse_quantity(raw: Any) -> int:
+    try:
+        if isinstance(raw, float) and raw.is_integer():
+            raw = int(raw)
+        quantity = int(str(raw).strip())
+        if quantity <= 0 or quantity > MAX_QUANTITY:
+            raise ValueError()
+        return quantity
+    except Exception:
+        raise ValueError("Quantity must be a valid number greater than 0.")
+
+
+def parse_amount(raw: Any) -> Decimal:
+    try:
+        # store as Decimal to match Numeric columns ("20,000" is fine)
+        amount = Decimal(str(raw).strip().replace(",", ""))
+        if not amount.is_finite() or amount <= 0:
+            raise InvalidOperation()
+        # Same rounding the Numeric(12, 2) column would apply
+        amount = amount.quantize(AMOUNT_STEP, rounding=ROUND_HALF_UP)
+    except Exception:
+        raise ValueError("Amount must be a valid number greater than 0.")
+    if amount <= 0 or amount >= AMOUNT_LIMIT:
+        raise ValueError(f"Amount must be greater than 0 and less than {AMOUNT_LIMIT:,.0f}.")
+    return amount
+
+
+def _clean(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+# ---------------- Streaming readers ----------------
+
+def _iter_xlsx(stream) -> Iterator[Sequence[Any]]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        for row in ws.iter_rows(values_only=True):
+            yield row
+    finally:
+        wb.close()
+
+
+def _iter_csv(stream) -> Iterator[Sequence[Any]]:
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv.reader(text_stream)
+    finally:
+        text_stream.detach()
+
+
+def iter_rows(stream, filename: str) -> Iterator[Sequence[Any]]:
+    name = (filename or "").lower()
+    if name.endswith(".xlsx") or name.endswith(".xlsm"):
+        return _iter_xlsx(stream)
+    if name.endswith(".csv"):
+        return _iter_csv(stream)
+    raise ValueError("Unsupported file type. Upload .xlsx or .csv")
+
+
+def _header_map(header: Sequence[Any]) -> Dict[str, int]:
+    mapping: Dict[str, int] = {}
+    for idx, raw in enumerate(header or []):
+        key = HEADER_ALIASES.get(_clean(raw).lower())
+        if key and key not in mapping:
+            mapping[key] = idx
+    missing = [c for c in REQUIRED_COLUMNS if c not in mapping]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    return mapping
+
+
+def _vendor_lookup() -> Dict[str, int]:
+    # One lookup for the whole file (served from the vendor catalog cache)
+    from app.vendor_cache import get_vendor_catalog
+
+    lookup: Dict[str, int] = {}
+    for v in get_vendor_catalog():
+        lookup.setdefault((v.name or "").strip().lower(), v.id)
+    return lookup
+
+
+def _build_row(cells: Sequence[Any], cols: Dict[str, int], vendors: Dict[str, int], now: datetime) -> Dict[str, Any]:
+    def cell(name: str) -> Any:
+        idx = cols.get(name)
+        return cells[idx] if idx is not None and idx < len(cells) else None
+
+    item = _clean(cell("item"))
+    qty_raw = cell("quantity")
+    amount_raw = cell("amount")
+    vendor_name = _clean(cell("vendor"))
+
+    if not item or _clean(qty_raw) == "" or _clean(amount_raw) == "" or not vendor_name:
+        raise ValueError("Item, Quantity, Amount, and Vendor are required.")
+
+    quantity = parse_quantity(qty_raw)
+    amount = parse_amount(amount_raw)
+
+    vendor_id = vendors.get(vendor_name.lower())
+    if vendor_id is None:
+        raise ValueError(f"Vendor not found: {vendor_name}")
+
+    if MAX_ITEM_LENGTH and len(item) > MAX_ITEM_LENGTH:
+        raise ValueError(f"Item must be {MAX_ITEM_LENGTH} characters or fewer.")
+
+    return {
+        "item": item,
+        "description": _clean(cell("description")) or None,
+        "quantity": quantity,
+        "amount": amount,
+        "vendor_id": vendor_id,
+        "is_urgent": _clean(cell("is_urgent")).lower() in TRUTHY,
+        "status": "pending",
+        "created_at": now,
+    }
+
+
+# ---------------- Batched insert ----------------
+
+def _audit_changes(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "item": values["item"],
+        "quantity": values["quantity"],
+        "amount": str(values["amount"]),
+        "vendor_id": values["vendor_id"],
+        "is_urgent": values["is_urgent"],
+        "status": values["status"],
+        "source": "import",
+    }
+
+
+def _insert_batch(batch: List[Tuple[int, Dict[str, Any]]]) -> int:
+    from app.audit import write_audit_events
+    from app.data_version import mark_data_changed
+    from app.kpis import add_kpi_delta
+    from app.rollups import add_request_deltas
+    from app.search import reindex_requests
+
+    table = ProcurementRequest.__table__
+    connection = db.session.connection()
+    ids = list(
+        connection.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            [values for _line, values in batch],
+        ).scalars()
+    )
+    reindex_requests(connection, ids)
+    add_request_deltas(connection, [(values["created_at"], None, values["status"]) for _line, values in batch])
+    mark_data_changed()
+    write_audit_events(
+        connection,
+        [
+            ("ProcurementRequest", new_id, "create", _audit_changes(values))
+            for new_id, (_line, values) in zip(ids, batch)
+        ],
+    )
+    # Core insert skips the ORM flush hooks: patch the dashboard KPIs here
+    add_kpi_delta(db.session, len(ids), sum(values["amount"] for _line, values in batch))
+    db.session.commit()
+    return len(ids)
+
+
+def _flush_batch(batch: List[Tuple[int, Dict[str, Any]]], report: ImportReport) -> None:
+    try:
+        report.inserted += _insert_batch(batch)
+    except Exception as e:
+        db.session.rollback()
+        if len(batch) == 1 or getattr(e, "connection_invalidated", False):
+            # Single row (or the DB itself is gone): report it as is
+            message = f"Database error: {getattr(e, 'orig', None) or e}"
+            for line, _values in batch:
+                report.errors.append((line, message))
+            return
+        # One bad row fails the whole executemany: split until only the
+        # rows that really fail are left
+        mid = len(batch) // 2
+        _flush_batch(batch[:mid], report)
+        _flush_batch(batch[mid:], report)
+
+
+def import_requests(stream, filename: str, batch_size: Optional[int] = None) -> ImportReport:
+    """
+    Imports procurement requests from an XLSX/CSV stream.
+    Needs an app context. Returns an ImportReport.
+    """
+    from flask import current_app
+
+    batch_size = batch_size or int(current_app.config.get("IMPORT_BATCH_SIZE", 1000))
+    report = ImportReport()
+    started = datetime.utcnow()
+
+    rows = iter_rows(stream, filename)
+    try:
+        cols = _header_map(next(rows, None))
+    except ValueError as e:
+        report.errors.append((1, str(e)))
+        return report
+
+    vendors = _vendor_lookup()
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+
+    for line, cells in enumerate(rows, start=2):
+        if not cells or all(_clean(c) == "" for c in cells):
+            continue
+        report.total_rows += 1
+        try:
+            batch.append((line, _build_row(cells, cols, vendors, started)))
+        except ValueError as e:
+            report.errors.append((line, str(e)))
+            continue
+        if len(batch) >= batch_size:
+            _flush_batch(batch, report)
+            batch = []
+
+    if batch:
+        _flush_batch(batch, report)
+
+    report.errors.sort(key=lambda e: e[0])
+    report.seconds = (datetime.utcnow() - started).total_seconds()
+    return report
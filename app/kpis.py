@@ -0,0 +1,209 @@
+"""
+Dashboard KPI snapshot.
+
+All dashboard figures come from one SELECT (scalar subqueries, one round
+trip) and are cached per process. Request/payment writes don't invalidate
+the snapshot, they patch it:
+
+  - after_flush collects count / amount deltas from the ORM changes
+  - after_commit applies them to the cached snapshot (rollback drops them)
+  - set-based writes that skip the ORM (bulk import) call add_kpi_delta()
+
+If the snapshot was reloaded between a flush and its commit we can't tell
+whether it already includes that write, so it's dropped instead of patched
+(same when an amount changed on an expired object and the old value is
+unknown).
+KPI_CACHE_TTL (seconds) bounds drift from other workers.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy import inspect as sa_inspect
+
+from app.extensions import db
+from app.models.payment import Payment
+from app.models.procurement_request import ProcurementRequest
+
+_lock = threading.Lock()
+_snapshot: Optional[Dict[str, Any]] = None
+_loaded_at = 0.0
+_generation = 0
+_ttl = 30.0
+
+ZERO = Decimal("0")
+
+
+def _dec(value: Any) -> Decimal:
+    if value is None:
+        return ZERO
+    try:
+        return Decimal(str(value))
+    except Exception:
+        return ZERO
+
+
+def _load() -> Dict[str, Any]:
+    row = db.session.execute(
+        select(
+            select(func.count(ProcurementRequest.id)).scalar_subquery(),
+            select(func.coalesce(func.sum(ProcurementRequest.amount), 0)).scalar_subquery(),
+            select(func.coalesce(func.sum(Payment.amount), 0)).scalar_subquery(),
+        )
+    ).one()
+    return {
+        "total_requests": int(row[0] or 0),
+        "total_request_amount": _dec(row[1]),
+        "total_paid": _dec(row[2]),
+    }
+
+
+def get_kpis() -> Dict[str, Any]:
+    """Dashboard figures (numbers only; callers format them)."""
+    global _snapshot, _loaded_at, _generation
+
+    with _lock:
+        if _snapshot is not None and (time.monotonic() - _loaded_at) < _ttl:
+            snap = dict(_snapshot)
+        else:
+            snap = None
+
+    if snap is None:
+        snap = _load()
+        with _lock:
+            _snapshot = dict(snap)
+            _loaded_at = time.monotonic()
+            _generation += 1
+
+    snap["outstanding"] = snap["total_request_amount"] - snap["total_paid"]
+    return snap
+
+
+def invalidate_kpis() -> None:
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def _apply(deltas: Dict[str, Any], generation: int) -> None:
+    global _snapshot
+    with _lock:
+        if _snapshot is None:
+            return
+        if generation != _generation or not deltas.get("exact", True):
+            _snapshot = None
+            return
+        _snapshot["total_requests"] += int(deltas.get("total_requests", 0))
+        _snapshot["total_request_amount"] += _dec(deltas.get("total_request_amount"))
+        _snapshot["total_paid"] += _dec(deltas.get("total_paid"))
+
+
+def add_kpi_delta(session, total_requests: int = 0, total_request_amount: Any = 0, total_paid: Any = 0) -> None:
+    """Queues a delta on `session`; applied to the snapshot when it commits."""
+    pending = session.info.get("kpi_deltas")
+    if pending is None:
+        with _lock:
+            generation = _generation
+        pending = session.info["kpi_deltas"] = {
+            "generation": generation,
+            "total_requests": 0,
+            "total_request_amount": ZERO,
+            "total_paid": ZERO,
+        }
+    pending["total_requests"] += int(total_requests)
+    pending["total_request_amount"] += _dec(total_request_amount)
+    pending["total_paid"] += _dec(total_paid)
+
+
+def _amount_change(obj: Any, key: str) -> Optional[Decimal]:
+    """new - old, or None when the old value wasn't loaded (expired object)."""
+    try:
+        hist = sa_inspect(obj).attrs[key].history
+    except Exception:
+        return None
+    if not hist.has_changes():
+        return ZERO
+    if not hist.deleted:
+        return None
+    new = hist.added[0] if hist.added else None
+    return _dec(new) - _dec(hist.deleted[0])
+
+
+def _after_flush(session, flush_context):
+    requests = 0
+    request_amount = ZERO
+    paid = ZERO
+    exact = True
+
+    for obj in session.new:
+        if isinstance(obj, ProcurementRequest):
+            requests += 1
+            request_amount += _dec(obj.amount)
+        elif isinstance(obj, Payment):
+            paid += _dec(obj.amount)
+
+    for obj in session.dirty:
+        if isinstance(obj, (ProcurementRequest, Payment)):
+            change = _amount_change(obj, "amount")
+            if change is None:
+                exact = False
+            elif isinstance(obj, ProcurementRequest):
+                request_amount += change
+            else:
+                paid += change
+
+    for obj in session.deleted:
+        if not isinstance(obj, (ProcurementRequest, Payment)):
+            continue
+        try:
+            amount = _dec(obj.amount)
+        except Exception:
+            exact = False  # row already gone, old amount unknown
+            continue
+        if isinstance(obj, ProcurementRequest):
+            requests -= 1
+            request_amount -= amount
+        else:
+            paid -= amount
+
+    if requests or request_amount or paid:
+        add_kpi_delta(session, requests, request_amount, paid)
+    if not exact:
+        # Can't compute a delta without the old value: reload on commit
+        add_kpi_delta(session)
+        session.info["kpi_deltas"]["exact"] = False
+
+
+def _after_commit(session):
+    # Also fires on savepoint release: apply on the real commit only
+    if session.get_nested_transaction() is not None:
+        return
+    pending = session.info.pop("kpi_deltas", None)
+    if pending:
+        _apply(pending, pending["generation"])
+
+
+def _after_soft_rollback(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop("kpi_deltas", None)
+        return
+    # A savepoint (or a flush failing inside one) may have taken some of the
+    # deltas with it: reload on commit
+    pending = session.info.get("kpi_deltas")
+    if pending:
+        pending["exact"] = False
+
+
+def init_kpis(app) -> None:
+    global _ttl
+    _ttl = float(app.config.get("KPI_CACHE_TTL", 30))
+
+    if not event.contains(db.session, "after_flush", _after_flush):
+        event.listen(db.session, "after_flush", _after_flush)
+        event.listen(db.session, "after_commit", _after_commit)
+        event.listen(db.session, "after_soft_rollback", _after_soft_rollback)
@@ -8,6 +8,10 @@ from app.models.vendor import Vendor  # noqa: F401
 from app.models.procurement_request import ProcurementRequest  # noqa: F401
 from app.models.procurement_quotation import ProcurementQuotation  # noqa: F401
 from app.models.payment import Payment  # noqa: F401
+from app.models.stored_blob import StoredBlob  # noqa: F401
+from app.models.idempotency_key import IdempotencyKey  # noqa: F401
+from app.models.data_version import DataVersion  # noqa: F401
+from app.models.rollups import RequestDailyRollup, SpendDailyRollup, SpendMonthlyRollup  # noqa: F401
 
 # Optional / if you actually use these models elsewhere
 # Keep them only if the files exist and classes match names:
@@ -4,6 +4,14 @@ from app.extensions import db
 
 class AuditLog(db.Model):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # Audit trail viewer (app/audit_trail.py): every filter is an equality
+        # prefix + the (created_at, id) keyset, newest first.
+        db.Index("ix_audit_logs_created_at_id", "created_at", "id"),
+        db.Index("ix_audit_logs_entity", "entity_type", "entity_id", "created_at", "id"),
+        db.Index("ix_audit_logs_actor", "actor_user_id", "created_at", "id"),
+        db.Index("ix_audit_logs_action", "action", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -0,0 +1,16 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class DataVersion(db.Model):
+    """
+    Monotonic change counter per data set (e.g. "reports"), bumped right
+    after a writing transaction commits (see app/data_version.py). Used as
+    the watermark in report cache keys.
+    """
+
+    __tablename__ = "data_versions"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0, server_default="0")
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -29,6 +29,13 @@ class Document(db.Model):
         nullable=False
     )
 
+    # Content-addressed file (stored_blobs.digest); NULL for legacy uploads
+    blob_digest = db.Column(
+        db.String(64),
+        nullable=True,
+        index=True
+    )
+
     uploaded_by = db.Column(
         db.String(100),
         nullable=False
@@ -0,0 +1,27 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class IdempotencyKey(db.Model):
+    """
+    One submitted form token (see app/idempotency.py).
+    Inserted in the same transaction as the write it protects, so a replayed
+    POST either finds the committed result or hits the unique index.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    key = db.Column(db.String(64), nullable=False, unique=True, index=True)
+    scope = db.Column(db.String(50), nullable=False)  # e.g. "finance.pay"
+
+    user_id = db.Column(db.Integer, nullable=True)
+
+    # Original outcome, replayed to duplicate submits
+    payment_id = db.Column(db.Integer, nullable=True)
+    result_message = db.Column(db.String(255), nullable=True)
+    result_category = db.Column(db.String(20), nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
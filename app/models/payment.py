@@ -1,6 +1,8 @@
 from datetime import datetime
 from decimal import Decimal
 
+from sqlalchemy import event
+
 from app.extensions import db
 
 
@@ -31,6 +33,12 @@ class Payment(db.Model):
     receipt_public_id = db.Column(db.String(255), nullable=True)
     receipt_uploaded_at = db.Column(db.DateTime, nullable=True)
 
+    # Receipt background upload: pending / uploaded / failed (NULL = no pipeline upload)
+    upload_status = db.Column(db.String(20), nullable=True)
+
+    # Content-addressed file (stored_blobs.digest); NULL for legacy uploads
+    blob_digest = db.Column(db.String(64), nullable=True, index=True)
+
     notes = db.Column(db.String(500), nullable=True)
 
     status = db.Column(db.String(50), nullable=False, default="paid")
@@ -38,6 +46,10 @@ class Payment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=True)
     paid_at = db.Column(db.DateTime, nullable=True)
 
+    # 📅 Persisted coalesce(paid_at, created_at) so date-range reports are
+    # index range scans (kept in sync by the before_insert/update hook below)
+    effective_paid_at = db.Column(db.DateTime, nullable=True, index=True)
+
     procurement_request = db.relationship(
         "ProcurementRequest",
         back_populates="payments",
@@ -53,3 +65,11 @@ class Payment(db.Model):
         if s == "":
             return Decimal("0.00")
         return Decimal(s)
+
+
+@event.listens_for(Payment, "before_insert")
+@event.listens_for(Payment, "before_update")
+def _sync_effective_paid_at(mapper, connection, target):
+    if target.created_at is None:
+        target.created_at = datetime.utcnow()
+    target.effective_paid_at = target.paid_at or target.created_at
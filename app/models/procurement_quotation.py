@@ -13,8 +13,15 @@ class ProcurementQuotation(db.Model):
         nullable=False
     )
 
+    # Empty while the background upload is pending (see app/uploads.py)
     file_path = db.Column(db.String(500), nullable=False)
 
+    # pending / uploaded / failed (NULL = uploaded before the pipeline existed)
+    upload_status = db.Column(db.String(20), nullable=True)
+
+    # Content-addressed file (stored_blobs.digest); NULL for legacy uploads
+    blob_digest = db.Column(db.String(64), nullable=True, index=True)
+
     created_at = db.Column(
         db.DateTime,
         default=datetime.utcnow,
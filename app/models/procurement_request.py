@@ -4,6 +4,27 @@ from app.extensions import db
 
 class ProcurementRequest(db.Model):
     __tablename__ = "procurement_requests"
+    __table_args__ = (
+        # Keyset pagination of the procurement list: ORDER BY created_at DESC, id DESC
+        db.Index("ix_procurement_requests_created_at_id", "created_at", "id"),
+        # Work queues (app/work_queues.py): WHERE status = ? ORDER BY is_urgent, created_at, id DESC.
+        # One partial index per queue status so the ever-growing paid/rejected
+        # history never bloats them (SQLite only matches partial indexes on an
+        # identical WHERE term, hence one per status rather than an IN list).
+        # amount is trailing so the FINANCE_LIMIT band filter stays in the index.
+        db.Index(
+            "ix_procurement_requests_queue_pending",
+            "is_urgent", "created_at", "id", "amount",
+            postgresql_where=db.text("status = 'pending'"),
+            sqlite_where=db.text("status = 'pending'"),
+        ),
+        db.Index(
+            "ix_procurement_requests_queue_approved",
+            "is_urgent", "created_at", "id", "amount",
+            postgresql_where=db.text("status = 'approved'"),
+            sqlite_where=db.text("status = 'approved'"),
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -25,6 +46,13 @@ class ProcurementRequest(db.Model):
         nullable=False
     )
 
+    # 📊 Denormalized summary (maintained by app/summaries.py on flush)
+    quotation_count = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    payment_count = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    total_paid = db.Column(db.Numeric(12, 2), default=0, server_default="0", nullable=False)
+    last_paid_at = db.Column(db.DateTime, nullable=True)
+    latest_receipt_url = db.Column(db.String(500), nullable=True)
+
     # 🔗 Vendor
     vendor_id = db.Column(
         db.Integer,
@@ -0,0 +1,39 @@
+from app.extensions import db
+
+
+class SpendDailyRollup(db.Model):
+    """
+    Payments per (day, paid_by_role): count + sum of coalesce(amount_paid, amount).
+    Maintained on flush by app/rollups.py; `flask rebuild-rollups` backfills.
+    """
+
+    __tablename__ = "spend_daily_rollups"
+
+    day = db.Column(db.Date, primary_key=True)
+    paid_by_role = db.Column(db.String(50), primary_key=True)  # lower-cased, "" when unknown
+
+    payment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    amount_paid = db.Column(db.Numeric(14, 2), nullable=False, default=0, server_default="0")
+
+
+class SpendMonthlyRollup(db.Model):
+    """Same as SpendDailyRollup, per (YYYY-MM, paid_by_role)."""
+
+    __tablename__ = "spend_monthly_rollups"
+
+    month = db.Column(db.String(7), primary_key=True)  # "YYYY-MM"
+    paid_by_role = db.Column(db.String(50), primary_key=True)
+
+    payment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    amount_paid = db.Column(db.Numeric(14, 2), nullable=False, default=0, server_default="0")
+
+
+class RequestDailyRollup(db.Model):
+    """Procurement requests per (created day, status)."""
+
+    __tablename__ = "request_daily_rollups"
+
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)  # lower-cased
+
+    request_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
@@ -0,0 +1,30 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class StoredBlob(db.Model):
+    """
+    One uploaded file, stored once under its SHA-256 digest.
+    ProcurementQuotation / Payment / Document rows point at it via
+    `blob_digest`; ref_count is maintained on flush (see app/uploads.py).
+    """
+
+    __tablename__ = "stored_blobs"
+
+    digest = db.Column(db.String(64), primary_key=True)  # sha256 hex
+
+    size = db.Column(db.BigInteger, nullable=False)
+    filename = db.Column(db.String(255), nullable=True)  # first uploader's name (for the extension)
+
+    # pending / uploaded / failed
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    spool_path = db.Column(db.String(500), nullable=True)
+
+    url = db.Column(db.String(500), nullable=True)
+    public_id = db.Column(db.String(255), nullable=True)
+    resource_type = db.Column(db.String(20), nullable=True)
+
+    ref_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    uploaded_at = db.Column(db.DateTime, nullable=True)
@@ -10,6 +10,12 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(100), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(50), nullable=False)
+    # "active" / "inactive" (toggled by directors, see users.toggle_user)
+    status = db.Column(db.String(20), nullable=False, default="active", server_default="active")
+
+    @property
+    def is_active(self):
+        return (self.status or "active") != "inactive"
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -0,0 +1,87 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor encodes the sort key of the last row on a page, so the next page is
+an index range scan from that key instead of an OFFSET scan. Page 500 costs
+the same as page 1.
+
+All keyset columns are ordered DESC (newest first), which is how every list
+in this app is shown.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+
+
+def clamp_per_page(raw: Any, default: int, maximum: int) -> int:
+    """Parses ?per_page=... safely (bad values fall back to the default)."""
+    try:
+        value = int(raw)
+    except Exception:
+        return default
+    if value <= 0:
+        return default
+    return min(value, maximum)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[Any]]:
+    """
+    Returns the decoded key values, or None for a missing/garbled cursor
+    (which simply means "first page" — never crash on a bad link).
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != size:
+            return None
+        return [_decode_value(v) for v in values]
+    except Exception:
+        return None
+
+
+def keyset_page(query, columns: Sequence[Any], cursor: Optional[str], per_page: int) -> Tuple[list, Optional[str]]:
+    """
+    Applies ORDER BY <columns> DESC + keyset filter + LIMIT to an ORM query.
+
+    `columns` must be mapped attributes that end in a unique column (usually
+    `Model.id`) so the ordering is total.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    after = decode_cursor(cursor, len(columns))
+    if after is not None:
+        query = query.filter(tuple_(*columns) < tuple_(*after))
+
+    rows = query.order_by(*[c.desc() for c in columns]).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+
+    return rows, next_cursor
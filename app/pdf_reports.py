@@ -0,0 +1,350 @@
+"""
+Background PDF spend reports (reportlab).
+
+A report is identified by sha256(filters + data watermark), see
+app/data_version.py. The rendered file lives at <PDF_REPORT_DIR>/<key>.pdf,
+so the same month requested twice (with no writes in between) is served
+straight from disk. Any write to requests/payments/vendors moves the
+watermark and the next request renders a fresh file.
+
+Rendering runs in a small thread pool, never on the request thread. Job
+state is kept next to the output (<key>.json) so any gunicorn worker can
+answer the status poll:
+
+  missing -> running -> ready (pdf exists)
+                     -> failed (json has the error; requesting again retries)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+from xml.sax.saxutils import escape
+
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models.payment import Payment
+from app.models.procurement_request import ProcurementRequest
+from app.models.vendor import Vendor
+from app.report_engine import (
+    ReportFilters,
+    build_report,
+    normalize_filters,
+    paid_amount_expr,
+    payments_query,
+    report_key,
+)
+
+KEY_LENGTH = 64
+
+_app = None
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_in_flight: Set[str] = set()
+
+
+# ---------------- Keys / paths ----------------
+
+def valid_key(key: str) -> bool:
+    return len(key or "") == KEY_LENGTH and all(c in "0123456789abcdef" for c in key)
+
+
+def report_dir(app) -> str:
+    folder = app.config.get("PDF_REPORT_DIR") or os.path.join(os.path.abspath(os.path.join(app.root_path, "..")), "reports_cache")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def pdf_path(app, key: str) -> str:
+    return os.path.join(report_dir(app), f"{key}.pdf")
+
+
+def _state_path(app, key: str) -> str:
+    return os.path.join(report_dir(app), f"{key}.json")
+
+
+def _write_state(app, key: str, state: Dict[str, Any]) -> None:
+    tmp = _state_path(app, key) + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(state, fh)
+    os.replace(tmp, _state_path(app, key))
+
+
+def _read_state(app, key: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_state_path(app, key)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def report_status(app, key: str) -> Dict[str, Any]:
+    """{"status": "ready" | "running" | "failed" | "missing", ...}"""
+    if os.path.exists(pdf_path(app, key)):
+        return {"status": "ready"}
+    state = _read_state(app, key)
+    if state is None:
+        return {"status": "missing"}
+    if state.get("status") == "running":
+        # A worker restart loses the job: treat old "running" as failed
+        timeout = float(app.config.get("PDF_REPORT_TIMEOUT", 600))
+        if time.time() - float(state.get("started", 0)) > timeout:
+            return {"status": "failed", "error": "Report job timed out."}
+    return state
+
+
+# ---------------- Scheduling ----------------
+
+def _get_executor() -> ThreadPoolExecutor:
+    # Created lazily so gunicorn forks before any thread exists
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(_app.config.get("PDF_REPORT_WORKERS", 1)) if _app else 1
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-report")
+        return _executor
+
+
+def request_report(filters: ReportFilters) -> str:
+    """
+    Returns the cache key for `filters` at the current data version,
+    scheduling a render unless the PDF exists or is already being built.
+    """
+    from flask import current_app
+
+    from app.data_version import get_data_version
+
+    app = current_app._get_current_object()
+    filters = normalize_filters(filters)
+    key = report_key(filters, get_data_version())
+
+    status = report_status(app, key)["status"]
+    if status in ("ready", "running"):
+        return key
+
+    with _executor_lock:
+        if key in _in_flight:
+            return key
+        _in_flight.add(key)
+
+    _write_state(
+        app,
+        key,
+        {
+            "status": "running",
+            "started": time.time(),
+            "filters": {
+                "start_date": filters.start_dt.date().isoformat(),
+                "end_date": filters.end_dt.date().isoformat(),
+                "role": filters.role,
+            },
+        },
+    )
+
+    if app.config.get("PDF_REPORT_SYNC"):
+        _run_job(key, filters)
+    else:
+        _get_executor().submit(_run_job, key, filters)
+    return key
+
+
+def _run_job(key: str, filters: ReportFilters) -> None:
+    app = _app
+    with app.app_context():
+        try:
+            render_report_pdf(pdf_path(app, key), filters)
+            try:
+                os.remove(_state_path(app, key))
+            except OSError:
+                pass
+            prune_reports(app)
+        except Exception as e:
+            app.logger.warning(f"PDF report {key[:12]} failed: {e}")
+            _write_state(app, key, {"status": "failed", "error": str(e)[:500]})
+        finally:
+            db.session.remove()
+            with _executor_lock:
+                _in_flight.discard(key)
+
+
+def prune_reports(app) -> int:
+    """Deletes cached PDFs/state older than PDF_REPORT_RETENTION_DAYS."""
+    cutoff = time.time() - float(app.config.get("PDF_REPORT_RETENTION_DAYS", 7)) * 86400
+    removed = 0
+    folder = report_dir(app)
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+# ---------------- Rendering ----------------
+
+def _detail_rows(filters: ReportFilters, limit: int) -> List[list]:
+    """Per-request spend inside the window, latest payment first."""
+    last_paid = func.max(Payment.effective_paid_at)
+    q = (
+        payments_query(filters)
+        .join(ProcurementRequest, ProcurementRequest.id == Payment.procurement_request_id)
+        .outerjoin(Vendor, Vendor.id == ProcurementRequest.vendor_id)
+        .with_entities(
+            ProcurementRequest.id,
+            ProcurementRequest.item,
+            Vendor.name,
+            ProcurementRequest.status,
+            ProcurementRequest.amount,
+            func.count(Payment.id),
+            func.sum(paid_amount_expr()),
+            last_paid,
+        )
+        .group_by(
+            ProcurementRequest.id,
+            ProcurementRequest.item,
+            Vendor.name,
+            ProcurementRequest.status,
+            ProcurementRequest.amount,
+        )
+        .order_by(last_paid.desc(), ProcurementRequest.id.desc())
+        .limit(limit + 1)
+    )
+    return [list(r) for r in q.all()]
+
+
+def _money(value: Any) -> str:
+    try:
+        return f"NGN {float(value or 0):,.2f}"
+    except (TypeError, ValueError):
+        return "-"
+
+
+def render_report_pdf(path: str, filters: ReportFilters) -> None:
+    """Spend summary + per-request detail. Written to a temp file, then renamed."""
+    from flask import current_app
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import LongTable, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    report = build_report(filters)
+    limit = int(current_app.config.get("PDF_REPORT_MAX_DETAIL_ROWS", 5000))
+    detail = _detail_rows(filters, limit)
+    truncated = len(detail) > limit
+    detail = detail[:limit]
+
+    styles = getSampleStyleSheet()
+    grid = TableStyle(
+        [
+            ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f0f0f0")),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("FONTSIZE", (0, 0), (-1, -1), 8),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ]
+    )
+
+    kpis = report["kpis"]
+    f = report["filters"]
+    story = [
+        Paragraph("QueensMeal Procurement Spend Report", styles["Title"]),
+        Paragraph(
+            f"{f['start_date']} to {f['end_date']} &middot; paid by: {escape(str(f['role']))} &middot; "
+            f"generated {datetime.utcnow():%Y-%m-%d %H:%M} UTC",
+            styles["Normal"],
+        ),
+        Spacer(1, 6 * mm),
+        Paragraph("Summary", styles["Heading2"]),
+        Table(
+            [
+                ["Total requests", "Approved", "Pending", "Rejected", "Total paid (window)"],
+                [
+                    kpis["total_requests"],
+                    kpis["approved_requests"],
+                    kpis["pending_requests"],
+                    kpis["rejected_requests"],
+                    _money(kpis["total_paid"]),
+                ],
+            ],
+            style=grid,
+        ),
+        Spacer(1, 4 * mm),
+    ]
+
+    by_role = report["charts"]["payments_by_role"]
+    by_month = report["charts"]["monthly_spend"]
+    if by_role["labels"]:
+        story += [
+            Paragraph("Spend by role", styles["Heading3"]),
+            Table([["Role", "Paid"]] + [[l, _money(v)] for l, v in zip(by_role["labels"], by_role["values"])], style=grid),
+            Spacer(1, 4 * mm),
+        ]
+    if by_month["labels"]:
+        story += [
+            Paragraph("Spend by month", styles["Heading3"]),
+            Table([["Month", "Paid"]] + [[l, _money(v)] for l, v in zip(by_month["labels"], by_month["values"])], style=grid),
+            Spacer(1, 4 * mm),
+        ]
+
+    story.append(Paragraph("Per-request detail", styles["Heading2"]))
+    if detail:
+        cell = styles["BodyText"].clone("cell", fontSize=8, leading=10)
+        rows = [["#", "Item", "Vendor", "Status", "Requested", "Payments", "Paid (window)", "Last paid"]]
+        for rid, item, vendor, status, amount, count, paid, last in detail:
+            rows.append(
+                [
+                    rid,
+                    Paragraph(escape(item or ""), cell),
+                    Paragraph(escape(vendor or "-"), cell),
+                    status,
+                    _money(amount),
+                    count,
+                    _money(paid),
+                    f"{last:%Y-%m-%d}" if isinstance(last, datetime) else (str(last)[:10] if last else "-"),
+                ]
+            )
+        story.append(
+            LongTable(
+                rows,
+                repeatRows=1,
+                style=grid,
+                colWidths=[14 * mm, 70 * mm, 45 * mm, 20 * mm, 30 * mm, 18 * mm, 30 * mm, 22 * mm],
+            )
+        )
+        if truncated:
+            story.append(
+                Paragraph(f"Showing the latest {limit} requests. Use the Excel export for the full list.", styles["Italic"])
+            )
+    else:
+        story.append(Paragraph("No payments in this period.", styles["Normal"]))
+
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        SimpleDocTemplate(
+            tmp,
+            pagesize=landscape(A4),
+            leftMargin=12 * mm,
+            rightMargin=12 * mm,
+            topMargin=12 * mm,
+            bottomMargin=12 * mm,
+            title="Procurement Spend Report",
+        ).build(story)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def init_pdf_reports(app) -> None:
+    global _app
+    _app = app
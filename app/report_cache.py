@@ -0,0 +1,58 @@
+"""
+In-process cache for the /reports payload + strong ETags.
+
+The computed kpis/charts for a (normalized filters, data version) pair never
+change, so they're kept in a small LRU keyed by report_key(). The data
+version comes from cached_data_version(), which means a repeat visit with a
+matching If-None-Match is answered 304 without a single report query.
+
+The ETag also covers the viewer (the page renders their name/role in the
+nav), so one user's cached page is never validated for another.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict
+
+from app.report_engine import ReportFilters, build_report, report_key
+
+_lock = threading.Lock()
+_entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_max_entries = 128
+
+
+def report_etag(key: str, user) -> str:
+    viewer = f"{getattr(user, 'id', '')}:{getattr(user, 'username', '')}:{getattr(user, 'role', '')}"
+    return hashlib.sha256(f"{key}|{viewer}".encode("utf-8")).hexdigest()[:40]
+
+
+def cached_report(filters: ReportFilters, version: int) -> Dict[str, Any]:
+    """build_report(filters) for this data version, computed at most once per process."""
+    key = report_key(filters, version)
+    with _lock:
+        hit = _entries.get(key)
+        if hit is not None:
+            _entries.move_to_end(key)
+            return copy.deepcopy(hit)
+
+    report = build_report(filters)
+    with _lock:
+        _entries[key] = report
+        _entries.move_to_end(key)
+        while len(_entries) > _max_entries:
+            _entries.popitem(last=False)
+    return copy.deepcopy(report)
+
+
+def clear_report_cache() -> None:
+    with _lock:
+        _entries.clear()
+
+
+def init_report_cache(app) -> None:
+    global _max_entries
+    _max_entries = max(1, int(app.config.get("REPORT_CACHE_SIZE", 128)))
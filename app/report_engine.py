@@ -0,0 +1,255 @@
+"""
+Report engine for /reports.
+
+The charts and KPIs read the rollup tables (app/rollups.py), never raw
+payments / procurement_requests, in two queries:
+
+  1. request_daily_rollups GROUP BY (status, day bucket), where the day
+     bucket is the day inside the chart window and NULL outside it. Summing
+     over buckets gives the all-time status KPIs; summing over statuses
+     gives the requests-per-day chart.
+  2. spend rollups GROUP BY (role, month): whole months in the window from
+     spend_monthly_rollups, edge days from spend_daily_rollups. Summing
+     gives total paid, per-role and per-month series.
+
+The window is whole days (start date .. end date inclusive). The CSV export
+still reads raw payments through payments_query().
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, Mapping
+
+from sqlalchemy import case, func, or_, select, union_all
+
+from app.extensions import db
+from app.models.payment import Payment
+from app.models.rollups import RequestDailyRollup, SpendDailyRollup, SpendMonthlyRollup
+
+ReportFilters = namedtuple("ReportFilters", ["start_dt", "end_dt", "role"])
+
+STATUS_KPIS = ("approved", "pending", "rejected")
+DEFAULT_WINDOW_DAYS = 30
+
+
+def parse_report_filters(args: Mapping[str, Any]) -> ReportFilters:
+    """?start_date=YYYY-MM-DD&end_date=...&paid_by_role=... with safe defaults."""
+    role = args.get("paid_by_role") or "all"
+    now = datetime.utcnow()
+    default_start = now - timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+    try:
+        start_date = args.get("start_date")
+        end_date = args.get("end_date")
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d") if start_date else default_start
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d") if end_date else now
+    except (TypeError, ValueError):
+        start_dt, end_dt = default_start, now
+    return ReportFilters(start_dt, end_dt, role)
+
+
+def normalize_filters(filters: ReportFilters) -> ReportFilters:
+    """Whole days: start 00:00:00 .. end 23:59:59.999999 (stable cache keys)."""
+    start = datetime.combine(filters.start_dt.date(), datetime.min.time())
+    end = datetime.combine(filters.end_dt.date(), datetime.min.time()) + timedelta(days=1) - timedelta(microseconds=1)
+    return ReportFilters(start, end, (filters.role or "all").lower())
+
+
+def report_key(filters: ReportFilters, version: int) -> str:
+    """sha256 of the (normalized) filters + data version, see app/data_version.py."""
+    payload = json.dumps(
+        {
+            "start": filters.start_dt.date().isoformat(),
+            "end": filters.end_dt.date().isoformat(),
+            "role": filters.role,
+            "version": version,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def paid_at_expr():
+    # persisted coalesce(paid_at, created_at), indexed
+    return Payment.effective_paid_at
+
+
+def paid_amount_expr():
+    return func.coalesce(Payment.amount_paid, Payment.amount)
+
+
+def month_expr(column, dialect: str):
+    """'YYYY-MM' label for a timestamp column."""
+    if dialect == "postgresql":
+        return func.to_char(func.date_trunc("month", column), "YYYY-MM")
+    if dialect in ("mysql", "mariadb"):
+        return func.date_format(column, "%Y-%m")
+    return func.strftime("%Y-%m", column)
+
+
+def payments_query(filters: ReportFilters):
+    """Payments in the report window (and role), as an ORM query."""
+    q = Payment.query.filter(paid_at_expr() >= filters.start_dt, paid_at_expr() <= filters.end_dt)
+    if filters.role != "all":
+        q = q.filter(func.lower(Payment.paid_by_role) == filters.role.lower())
+    return q
+
+
+PAYMENT_EXPORT_HEADER = [
+    "Payment ID",
+    "Procurement Request ID",
+    "Amount",
+    "Paid By Role",
+    "Paid By Name",
+    "Paid At",
+    "Receipt URL",
+]
+
+
+def iter_payment_export_rows(filters: ReportFilters, batch_size: int = 1000) -> Iterator[list]:
+    """
+    Export rows, newest first, fetched `batch_size` at a time through a
+    server-side cursor (yield_per => stream_results), so memory stays flat
+    however many payments match. Needs the session alive while iterating.
+    """
+    stmt = (
+        payments_query(filters)
+        .with_entities(
+            Payment.id,
+            Payment.procurement_request_id,
+            paid_amount_expr(),
+            Payment.paid_by_role,
+            Payment.paid_by_name,
+            Payment.paid_at,
+            Payment.receipt_url,
+        )
+        .order_by(Payment.effective_paid_at.desc(), Payment.id.desc())
+        .statement
+    )
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    try:
+        for row in result:
+            yield list(row)
+    finally:
+        result.close()
+
+
+def _day_labels(filters: ReportFilters):
+    return [
+        (filters.start_dt.date() + timedelta(days=i)).isoformat()
+        for i in range((filters.end_dt.date() - filters.start_dt.date()).days + 1)
+    ]
+
+
+def _request_figures(filters: ReportFilters) -> Dict[str, Any]:
+    # request_daily_rollups: (day, status) rows, not raw requests
+    r = RequestDailyRollup
+    start_day, end_day = filters.start_dt.date(), filters.end_dt.date()
+    day_bucket = case(((r.day >= start_day) & (r.day <= end_day), r.day), else_=None)
+
+    rows = (
+        db.session.query(r.status, day_bucket, func.sum(r.request_count))
+        .group_by(r.status, day_bucket)
+        .all()
+    )
+
+    by_status: Dict[str, int] = {}
+    by_day: Dict[str, int] = {}
+    for row_status, day, count in rows:
+        count = int(count or 0)
+        by_status[row_status or ""] = by_status.get(row_status or "", 0) + count
+        if day is not None:
+            by_day[str(day)] = by_day.get(str(day), 0) + count
+
+    days = _day_labels(filters)
+    return {
+        "total_requests": sum(by_status.values()),
+        "by_status": by_status,
+        "requests_daily": dict(labels=days, values=[by_day.get(d, 0) for d in days]),
+    }
+
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _next_month(d: date) -> date:
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _payment_figures(filters: ReportFilters) -> Dict[str, Any]:
+    """
+    Whole months inside the window come from spend_monthly_rollups, the
+    partial months at either edge from spend_daily_rollups (one UNION ALL).
+    """
+    dialect = db.session.get_bind().dialect.name
+    start_day, end_day = filters.start_dt.date(), filters.end_dt.date()
+
+    # [full_from, full_to) = whole calendar months inside [start_day, end_day]
+    full_from = start_day if start_day.day == 1 else _next_month(start_day)
+    full_to = _month_start(end_day + timedelta(days=1))
+    if full_to < full_from:
+        full_to = full_from
+
+    d = SpendDailyRollup
+    m = SpendMonthlyRollup
+    daily = (
+        select(d.paid_by_role.label("role"), month_expr(d.day, dialect).label("month"), d.amount_paid.label("amount"))
+        .where(d.day >= start_day, d.day <= end_day)
+        .where(or_(d.day < full_from, d.day >= full_to))
+    )
+    monthly = select(m.paid_by_role, m.month, m.amount_paid).where(
+        m.month >= full_from.strftime("%Y-%m"), m.month < full_to.strftime("%Y-%m")
+    )
+    if filters.role != "all":
+        daily = daily.where(d.paid_by_role == filters.role.lower())
+        monthly = monthly.where(m.paid_by_role == filters.role.lower())
+
+    parts = union_all(daily, monthly).subquery()
+    rows = db.session.execute(
+        select(parts.c.role, parts.c.month, func.sum(parts.c.amount)).group_by(parts.c.role, parts.c.month)
+    ).all()
+
+    total = 0.0
+    by_role: Dict[str, float] = OrderedDict()
+    by_month: Dict[str, float] = {}
+    for row_role, row_month, amount in rows:
+        amount = float(amount or 0)
+        total += amount
+        key = row_role or "unknown"
+        by_role[key] = by_role.get(key, 0.0) + amount
+        by_month[row_month] = by_month.get(row_month, 0.0) + amount
+
+    months = sorted(m for m in by_month if m is not None)
+    return {
+        "total_paid": total,
+        "payments_by_role": dict(labels=list(by_role), values=list(by_role.values())),
+        "monthly_spend": dict(labels=months, values=[by_month[m] for m in months]),
+    }
+
+
+def build_report(filters: ReportFilters) -> Dict[str, Any]:
+    """kpis / charts / filters for reports/index.html (two queries total)."""
+    requests = _request_figures(filters)
+    payments = _payment_figures(filters)
+
+    kpis = dict(total_requests=requests["total_requests"], total_paid=payments["total_paid"])
+    for status in STATUS_KPIS:
+        kpis[f"{status}_requests"] = requests["by_status"].get(status, 0)
+
+    return dict(
+        kpis=kpis,
+        charts=dict(
+            requests_daily=requests["requests_daily"],
+            payments_by_role=payments["payments_by_role"],
+            monthly_spend=payments["monthly_spend"],
+        ),
+        filters=dict(
+            start_date=filters.start_dt.date().isoformat(),
+            end_date=filters.end_dt.date().isoformat(),
+            role=filters.role,
+        ),
+    )
@@ -0,0 +1,317 @@
+"""
+Report rollup tables (see app/models/rollups.py):
+
+  spend_daily_rollups    (day, paid_by_role)   -> payment_count, amount_paid
+  spend_monthly_rollups  (month, paid_by_role) -> payment_count, amount_paid
+  request_daily_rollups  (day, status)         -> request_count
+
+Kept current by delta upserts inside the business transaction:
+  - before_flush snapshots the *stored* bucket of payments/requests that are
+    about to change bucket-relevant columns or be deleted (one SELECT per table)
+  - after_flush subtracts the old bucket, adds the new one, and upserts the
+    non-zero deltas (INSERT .. ON CONFLICT DO UPDATE SET n = n + excluded.n)
+  - set-based writes that skip the ORM (bulk import, bulk approve/reject)
+    call add_request_deltas() themselves
+
+`flask rebuild-rollups` recomputes everything from the raw tables.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, delete, event, func, insert, literal, select, update
+from sqlalchemy import inspect as sa_inspect
+
+from app.extensions import db
+from app.models.payment import Payment
+from app.models.procurement_request import ProcurementRequest
+from app.models.rollups import RequestDailyRollup, SpendDailyRollup, SpendMonthlyRollup
+
+PAYMENT_KEYS = ("amount", "amount_paid", "paid_by_role", "paid_at", "created_at")
+REQUEST_KEYS = ("status", "created_at")
+
+ZERO = Decimal("0")
+
+
+# ---------------- Bucketing ----------------
+
+def _day(value: Any) -> Optional[date]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.fromisoformat(str(value)).date()
+    except Exception:
+        return None
+
+
+def _role_key(role: Any) -> str:
+    return (role or "").strip().lower()
+
+
+def _status_key(status: Any) -> str:
+    return (status or "").strip().lower()
+
+
+def _dec(value: Any) -> Decimal:
+    try:
+        return Decimal(str(value)) if value is not None else ZERO
+    except Exception:
+        return ZERO
+
+
+def _payment_bucket(amount, amount_paid, role, paid_at, created_at) -> Optional[Tuple[date, str, Decimal]]:
+    day = _day(paid_at or created_at)
+    if day is None:
+        return None
+    return day, _role_key(role), _dec(amount_paid if amount_paid is not None else amount)
+
+
+def _request_bucket(status, created_at) -> Optional[Tuple[date, str]]:
+    day = _day(created_at)
+    if day is None:
+        return None
+    return day, _status_key(status)
+
+
+# ---------------- Upserts ----------------
+
+def _upsert(connection, table, keys: Tuple[str, ...], rows: list) -> None:
+    if not rows:
+        return
+    counters = [c.name for c in table.columns if c.name not in keys]
+    dialect = connection.dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={c: table.c[c] + stmt.excluded[c] for c in counters},
+        )
+        connection.execute(stmt, rows)
+        return
+
+    # Portable fallback: UPDATE, INSERT when nothing matched
+    for row in rows:
+        result = connection.execute(
+            update(table)
+            .where(and_(*[table.c[k] == row[k] for k in keys]))
+            .values({c: table.c[c] + row[c] for c in counters})
+        )
+        if not result.rowcount:
+            connection.execute(insert(table), [row])
+
+
+def _apply_spend(connection, deltas: Dict[Tuple[date, str], list]) -> None:
+    daily = []
+    monthly: Dict[Tuple[str, str], list] = defaultdict(lambda: [0, ZERO])
+    for (day, role), (count, amount) in deltas.items():
+        if not count and not amount:
+            continue
+        daily.append({"day": day, "paid_by_role": role, "payment_count": count, "amount_paid": amount})
+        bucket = monthly[(day.strftime("%Y-%m"), role)]
+        bucket[0] += count
+        bucket[1] += amount
+
+    _upsert(connection, SpendDailyRollup.__table__, ("day", "paid_by_role"), daily)
+    _upsert(
+        connection,
+        SpendMonthlyRollup.__table__,
+        ("month", "paid_by_role"),
+        [
+            {"month": month, "paid_by_role": role, "payment_count": count, "amount_paid": amount}
+            for (month, role), (count, amount) in monthly.items()
+            if count or amount
+        ],
+    )
+
+
+def _apply_requests(connection, deltas: Dict[Tuple[date, str], int]) -> None:
+    _upsert(
+        connection,
+        RequestDailyRollup.__table__,
+        ("day", "status"),
+        [
+            {"day": day, "status": status, "request_count": count}
+            for (day, status), count in deltas.items()
+            if count
+        ],
+    )
+
+
+def add_request_deltas(connection, changes: Iterable[Tuple[Any, Optional[str], Optional[str]]]) -> None:
+    """
+    For Core writes that bypass the flush hook.
+    changes: (created_at, old_status or None for inserts, new_status or None for deletes)
+    """
+    deltas: Dict[Tuple[date, str], int] = defaultdict(int)
+    for created_at, old_status, new_status in changes:
+        day = _day(created_at)
+        if day is None:
+            continue
+        if old_status is not None:
+            deltas[(day, _status_key(old_status))] -= 1
+        if new_status is not None:
+            deltas[(day, _status_key(new_status))] += 1
+    _apply_requests(connection, deltas)
+
+
+# ---------------- Flush hooks ----------------
+
+def _changed(obj: Any, keys: Tuple[str, ...]) -> bool:
+    try:
+        attrs = sa_inspect(obj).attrs
+        return any(attrs[k].history.has_changes() for k in keys)
+    except Exception:
+        return True
+
+
+def _before_flush(session, flush_context, instances):
+    pay_ids = set()
+    req_ids = set()
+    for obj in list(session.dirty) + list(session.deleted):
+        deleting = obj in session.deleted
+        if isinstance(obj, Payment) and obj.id is not None and (deleting or _changed(obj, PAYMENT_KEYS)):
+            pay_ids.add(obj.id)
+        elif isinstance(obj, ProcurementRequest) and obj.id is not None and (deleting or _changed(obj, REQUEST_KEYS)):
+            req_ids.add(obj.id)
+
+    if not pay_ids and not req_ids:
+        return
+
+    # What the rollups currently count these rows as (the stored values)
+    connection = session.connection()
+    old = session.info.setdefault("rollup_old", {})
+    if pay_ids:
+        p = Payment.__table__
+        for row in connection.execute(
+            select(p.c.id, p.c.amount, p.c.amount_paid, p.c.paid_by_role, p.c.paid_at, p.c.created_at)
+            .where(p.c.id.in_(sorted(pay_ids)))
+        ):
+            old.setdefault(("payment", row[0]), _payment_bucket(*row[1:]))
+    if req_ids:
+        r = ProcurementRequest.__table__
+        for row in connection.execute(
+            select(r.c.id, r.c.status, r.c.created_at).where(r.c.id.in_(sorted(req_ids)))
+        ):
+            old.setdefault(("request", row[0]), _request_bucket(*row[1:]))
+
+
+def _current_payment(obj: Payment):
+    return _payment_bucket(obj.amount, obj.amount_paid, obj.paid_by_role, obj.paid_at, obj.created_at)
+
+
+def _current_request(obj: ProcurementRequest):
+    return _request_bucket(obj.status, obj.created_at)
+
+
+def _after_flush(session, flush_context):
+    old = session.info.pop("rollup_old", {})
+    spend: Dict[Tuple[date, str], list] = defaultdict(lambda: [0, ZERO])
+    requests: Dict[Tuple[date, str], int] = defaultdict(int)
+
+    def add_spend(bucket, sign):
+        if bucket:
+            day, role, amount = bucket
+            spend[(day, role)][0] += sign
+            spend[(day, role)][1] += sign * amount
+
+    def add_request(bucket, sign):
+        if bucket:
+            requests[bucket] += sign
+
+    def stored(kind, obj, current):
+        if (kind, obj.id) in old:
+            return old[(kind, obj.id)]
+        # Cascade-deleted in this flush without a snapshot: use loaded values
+        try:
+            return current(obj)
+        except Exception:
+            return None
+
+    for obj in session.new:
+        if isinstance(obj, Payment):
+            add_spend(_current_payment(obj), +1)
+        elif isinstance(obj, ProcurementRequest):
+            add_request(_current_request(obj), +1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Payment) and ("payment", obj.id) in old:
+            add_spend(old[("payment", obj.id)], -1)
+            add_spend(_current_payment(obj), +1)
+        elif isinstance(obj, ProcurementRequest) and ("request", obj.id) in old:
+            add_request(old[("request", obj.id)], -1)
+            add_request(_current_request(obj), +1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Payment):
+            add_spend(stored("payment", obj, _current_payment), -1)
+        elif isinstance(obj, ProcurementRequest):
+            add_request(stored("request", obj, _current_request), -1)
+
+    if spend or requests:
+        connection = session.connection()
+        _apply_spend(connection, spend)
+        _apply_requests(connection, requests)
+
+
+def _after_rollback(session):
+    session.info.pop("rollup_old", None)
+
+
+# ---------------- Rebuild ----------------
+
+def rebuild_rollups(connection) -> None:
+    """Recomputes all rollup tables from payments / procurement_requests."""
+    from app.report_engine import month_expr
+
+    p = Payment.__table__
+    r = ProcurementRequest.__table__
+    dialect = connection.dialect.name
+
+    paid_day = func.date(p.c.effective_paid_at)
+    paid_month = month_expr(p.c.effective_paid_at, dialect)
+    role = func.coalesce(func.lower(p.c.paid_by_role), literal(""))
+    paid = func.coalesce(func.sum(func.coalesce(p.c.amount_paid, p.c.amount)), 0)
+
+    for table in (SpendDailyRollup.__table__, SpendMonthlyRollup.__table__, RequestDailyRollup.__table__):
+        connection.execute(delete(table))
+
+    connection.execute(
+        insert(SpendDailyRollup.__table__).from_select(
+            ["day", "paid_by_role", "payment_count", "amount_paid"],
+            select(paid_day, role, func.count(p.c.id), paid).where(paid_day.isnot(None)).group_by(paid_day, role),
+        )
+    )
+    connection.execute(
+        insert(SpendMonthlyRollup.__table__).from_select(
+            ["month", "paid_by_role", "payment_count", "amount_paid"],
+            select(paid_month, role, func.count(p.c.id), paid).where(paid_month.isnot(None)).group_by(paid_month, role),
+        )
+    )
+    created_day = func.date(r.c.created_at)
+    status = func.coalesce(func.lower(r.c.status), literal(""))
+    connection.execute(
+        insert(RequestDailyRollup.__table__).from_select(
+            ["day", "status", "request_count"],
+            select(created_day, status, func.count(r.c.id)).group_by(created_day, status),
+        )
+    )
+
+
+def init_rollups(app) -> None:
+    if not event.contains(db.session, "after_flush", _after_flush):
+        event.listen(db.session, "before_flush", _before_flush)
+        event.listen(db.session, "after_flush", _after_flush)
+        event.listen(db.session, "after_rollback", _after_rollback)
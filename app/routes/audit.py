@@ -1,7 +1,11 @@
-from flask import Blueprint, render_template, redirect, url_for, flash
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, abort
 from flask_login import login_required, current_user
 
-from app.models.audit_log import AuditLog
+from app.audit import TRACKED_MODELS
+from app.audit_archive import archive_dir
+from app.audit_trail import ACTIONS, audit_page, entity_timeline, filter_args, parse_audit_filters
+from app.exports import AUDIT_EXPORT_HEADER, iter_audit_export_rows, xlsx_response
+from app.models.user import User
 
 audit_bp = Blueprint("audit", __name__, url_prefix="/audit")
 
@@ -18,5 +22,67 @@ def index():
         flash("You are not allowed to view Audit Trail.", "danger")
         return redirect(url_for("procurement.index"))
 
-    logs = AuditLog.query.order_by(AuditLog.created_at.desc()).limit(200).all()
-    return render_template("audit/index.html", logs=logs)
+    filters = parse_audit_filters(request.args)
+    logs, next_cursor, per_page = audit_page(filters, request.args.get("cursor"), request.args.get("per_page"))
+    actors = User.query.with_entities(User.id, User.username).order_by(User.username).all()
+
+    return render_template(
+        "audit/index.html",
+        logs=logs,
+        filters=filters,
+        filter_args=filter_args(filters),
+        entity_types=sorted(TRACKED_MODELS),
+        actions=ACTIONS,
+        actors=actors,
+        next_cursor=next_cursor,
+        is_first_page=not request.args.get("cursor"),
+        per_page=per_page,
+    )
+
+
+@audit_bp.route("/<entity_type>/<entity_id>")
+@login_required
+def timeline(entity_type, entity_id):
+    if _role() not in ("director", "audit"):
+        flash("You are not allowed to view Audit Trail.", "danger")
+        return redirect(url_for("procurement.index"))
+    if entity_type not in TRACKED_MODELS:
+        abort(404)
+
+    # Entity + related children (payments/quotations of a request), hot
+    # table first, then the cold archive
+    logs, next_cursor, per_page, keys = entity_timeline(
+        entity_type,
+        entity_id,
+        request.args.get("cursor"),
+        request.args.get("per_page"),
+        archive_folder=archive_dir(current_app),
+    )
+    return render_template(
+        "audit/request.html",
+        entity_type=entity_type,
+        entity_id=entity_id,
+        logs=logs,
+        related=keys[1:],
+        next_cursor=next_cursor,
+        is_first_page=not request.args.get("cursor"),
+        per_page=per_page,
+    )
+
+
+@audit_bp.route("/export.xlsx")
+@login_required
+def export_xlsx():
+    if _role() not in ("director", "audit"):
+        flash("You are not allowed to view Audit Trail.", "danger")
+        return redirect(url_for("procurement.index"))
+
+    # Same window as the trail viewer: ?start_date=&end_date= (end date inclusive)
+    filters = parse_audit_filters(request.args)
+
+    return xlsx_response(
+        "audit_trail.xlsx",
+        "Audit Trail",
+        AUDIT_EXPORT_HEADER,
+        iter_audit_export_rows(filters.start_dt, filters.end_dt, int(current_app.config.get("EXPORT_BATCH_SIZE", 1000))),
+    )
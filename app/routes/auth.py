@@ -19,7 +19,9 @@ def login():
         user = User.query.filter_by(username=username).first()
 
         if user and user.check_password(password):
-            login_user(user)
+            if not login_user(user):
+                flash("This account has been disabled.", "danger")
+                return render_template("auth/login.html")
             return redirect(url_for("procurement.index"))
 
         flash("Invalid username or password", "danger")
@@ -1,25 +1,21 @@
 from flask import Blueprint, render_template
 from flask_login import login_required, current_user
-from sqlalchemy import func
-from app.extensions import db
-from app.models.procurement_request import ProcurementRequest
-from app.models.payment import Payment
+
+from app.kpis import get_kpis
 
 dashboard_bp = Blueprint("dashboard", __name__)
 
 @dashboard_bp.route("/")
 @login_required
 def home():
-    total_requests = db.session.query(func.count(ProcurementRequest.id)).scalar() or 0
-    total_request_amount = db.session.query(func.coalesce(func.sum(ProcurementRequest.amount), 0)).scalar() or 0
-
-    total_paid = db.session.query(func.coalesce(func.sum(Payment.amount), 0)).scalar() or 0
+    # Cached snapshot (app/kpis.py): no table scans on a page view
+    kpis = get_kpis()
 
     stats = {
-        "total_requests": int(total_requests),
-        "total_request_amount": float(total_request_amount),
-        "total_paid": float(total_paid),
-        "outstanding": float(total_request_amount) - float(total_paid),
+        "total_requests": kpis["total_requests"],
+        "total_request_amount": float(kpis["total_request_amount"]),
+        "total_paid": float(kpis["total_paid"]),
+        "outstanding": float(kpis["outstanding"]),
         "role": getattr(current_user, "role", None),
     }
 
@@ -3,16 +3,18 @@ from decimal import Decimal
 
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload, selectinload
 
+from app.audit import write_audit_events
+from app.data_version import mark_data_changed
 from app.extensions import db
+from app.idempotency import record_key, replay_result, request_key
 from app.models.procurement_request import ProcurementRequest
 from app.models.payment import Payment
-
-try:
-    import cloudinary.uploader
-    CLOUDINARY_OK = True
-except Exception:
-    CLOUDINARY_OK = False
+from app.rollups import add_request_deltas
+from app.uploads import attach_upload, discard_spool, enqueue_upload, spool_upload
+from app.work_queues import queue_depths, queue_page
 
 
 director_bp = Blueprint("director", __name__, url_prefix="/director")
@@ -29,11 +31,32 @@ def approvals():
         flash("Access denied.", "danger")
         return redirect(url_for("procurement.index"))
 
-    requests = ProcurementRequest.query.order_by(
-        ProcurementRequest.created_at.desc()
-    ).all()
+    # Work queue, not history: pending requests to approve, or approved
+    # requests above FINANCE_LIMIT that the director pays. Urgent first.
+    queue = request.args.get("queue", "pending")
+    if queue not in ("pending", "to_pay"):
+        queue = "pending"
+    status, band = ("pending", None) if queue == "pending" else ("approved", "director")
+
+    # Counts/totals come from summary columns; vendor + quotation links are
+    # batch-loaded instead of lazy-loaded per card.
+    requests, next_cursor, per_page = queue_page(
+        status,
+        band,
+        request.args.get("cursor"),
+        request.args.get("per_page"),
+        options=(joinedload(ProcurementRequest.vendor), selectinload(ProcurementRequest.quotations)),
+    )
 
-    return render_template("director/approvals.html", requests=requests)
+    return render_template(
+        "director/approvals.html",
+        requests=requests,
+        queue=queue,
+        depths=queue_depths(),
+        next_cursor=next_cursor,
+        is_first_page=not request.args.get("cursor"),
+        per_page=per_page,
+    )
 
 
 @director_bp.route("/approve/<int:request_id>", methods=["POST"])
@@ -56,11 +79,83 @@ def reject(request_id):
     return redirect(url_for("director.approvals"))
 
 
+BULK_ACTIONS = {"approve": "approved", "reject": "rejected"}
+
+
+@director_bp.route("/bulk", methods=["POST"])
+@login_required
+def bulk_action():
+    if _role() != "director":
+        flash("Access denied.", "danger")
+        return redirect(url_for("procurement.index"))
+
+    new_status = BULK_ACTIONS.get((request.form.get("action") or "").lower())
+    if not new_status:
+        flash("Unknown bulk action.", "danger")
+        return redirect(url_for("director.approvals"))
+
+    requested = set()
+    for raw in request.form.getlist("request_ids"):
+        try:
+            requested.add(int(raw))
+        except (TypeError, ValueError):
+            continue
+    if not requested:
+        flash("Select at least one request.", "warning")
+        return redirect(url_for("director.approvals"))
+
+    # One set-based UPDATE; the status guard makes it safe against another
+    # director acting on the same rows, and RETURNING tells us who we won.
+    table = ProcurementRequest.__table__
+    try:
+        connection = db.session.connection()
+        rows = connection.execute(
+            update(table)
+            .where(table.c.id.in_(sorted(requested)), table.c.status == "pending")
+            .values(status=new_status)
+            .returning(table.c.id, table.c.created_at)
+        ).all()
+        changed = {row.id for row in rows}
+        add_request_deltas(connection, [(row.created_at, "pending", new_status) for row in rows])
+        if rows:
+            mark_data_changed()
+        write_audit_events(
+            connection,
+            [
+                ("ProcurementRequest", rid, "update", {"status": {"old": "pending", "new": new_status}})
+                for rid in sorted(changed)
+            ],
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Bulk update failed: {e}", "danger")
+        return redirect(url_for("director.approvals"))
+
+    # Rows already loaded in this session must not keep the old status
+    db.session.expire_all()
+
+    skipped = sorted(requested - changed)
+    if changed:
+        flash(f"{len(changed)} request(s) {new_status}.", "success" if new_status == "approved" else "warning")
+    if skipped:
+        flash(
+            "Skipped (no longer pending): " + ", ".join(f"#{rid}" for rid in skipped),
+            "info",
+        )
+    return redirect(url_for("director.approvals"))
+
+
 @director_bp.route("/pay/<int:request_id>", methods=["POST"])
 @login_required
 def pay(request_id):
     req = ProcurementRequest.query.get_or_404(request_id)
 
+    # Browser retry / double-click: replay the first result, touch nothing
+    idem_key = request_key()
+    if replay_result(idem_key, "director.pay"):
+        return redirect(url_for("director.approvals"))
+
     amount_paid = request.form.get("amount_paid")
     receipt = request.files.get("receipt")
 
@@ -68,43 +163,41 @@ def pay(request_id):
         flash("Amount is required.", "danger")
         return redirect(url_for("director.approvals"))
 
-    receipt_url = None
-    receipt_public_id = None
-
+    # Receipt is hashed + spooled locally and uploaded in the background
+    # after commit (identical files already stored are reused, not re-uploaded)
+    spooled = None
     if receipt and receipt.filename:
-        if not CLOUDINARY_OK:
-            flash("Receipt upload not available.", "danger")
+        try:
+            spooled = spool_upload(receipt)
+        except Exception as e:
+            flash(f"Could not save receipt: {e}", "danger")
             return redirect(url_for("director.approvals"))
 
-        res = cloudinary.uploader.upload(
-            receipt,
-            folder="queensmeal/procurement/receipts",
-            resource_type="auto",
-        )
-        receipt_url = res.get("secure_url")
-        receipt_public_id = res.get("public_id")
-
     payment = Payment(
         procurement_request_id=req.id,
         amount=req.amount,                     # ✅ REQUIRED BY DB
         amount_paid=Decimal(amount_paid),
         paid_by_role="director",
         paid_by_name=current_user.username,
-        receipt_url=receipt_url,
-        receipt_public_id=receipt_public_id,
-        receipt_uploaded_at=datetime.utcnow() if receipt_url else None,
         status="paid",
         created_at=datetime.utcnow(),
         paid_at=datetime.utcnow(),
     )
 
     try:
+        if spooled:
+            attach_upload(payment, spooled)
         db.session.add(payment)
         req.status = "paid"
+        record_key(idem_key, "director.pay", payment, "Payment completed.")
         db.session.commit()
+        enqueue_upload(payment)
         flash("Payment completed.", "success")
     except Exception as e:
         db.session.rollback()
-        flash(f"Payment failed: {e}", "danger")
+        discard_spool(spooled)
+        # Lost the race to an identical submit: report the winner's result
+        if not replay_result(idem_key, "director.pay"):
+            flash(f"Payment failed: {e}", "danger")
 
     return redirect(url_for("director.approvals"))
@@ -3,16 +3,15 @@ from decimal import Decimal
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 
+from app.constants import FINANCE_LIMIT
 from app.extensions import db
+from app.idempotency import record_key, replay_result, request_key
 from app.models.procurement_request import ProcurementRequest
 from app.models.payment import Payment
-
-try:
-    import cloudinary.uploader
-    CLOUDINARY_OK = True
-except Exception:
-    CLOUDINARY_OK = False
+from app.uploads import attach_upload, discard_spool, enqueue_upload, spool_upload
+from app.work_queues import BANDS, queue_depths, queue_page
 
 
 finance_bp = Blueprint("finance", __name__, url_prefix="/finance")
@@ -29,11 +28,30 @@ def payments():
         flash("Access denied.", "danger")
         return redirect(url_for("procurement.index"))
 
-    requests = ProcurementRequest.query.order_by(
-        ProcurementRequest.created_at.desc()
-    ).all()
+    # Approved-but-unpaid work queue, split at FINANCE_LIMIT (finance pays up
+    # to the limit, the director above it). Urgent first.
+    band = request.args.get("band") or ("director" if _role() == "director" else "finance")
+    if band not in BANDS:
+        band = "finance"
+
+    requests, next_cursor, per_page = queue_page(
+        "approved",
+        band,
+        request.args.get("cursor"),
+        request.args.get("per_page"),
+        options=(joinedload(ProcurementRequest.vendor),),
+    )
 
-    return render_template("finance/payments.html", requests=requests)
+    return render_template(
+        "finance/payments.html",
+        requests=requests,
+        band=band,
+        finance_limit=FINANCE_LIMIT,
+        depths=queue_depths(),
+        next_cursor=next_cursor,
+        is_first_page=not request.args.get("cursor"),
+        per_page=per_page,
+    )
 
 
 @finance_bp.route("/pay/<int:request_id>", methods=["POST"])
@@ -41,6 +59,11 @@ def payments():
 def pay(request_id):
     req = ProcurementRequest.query.get_or_404(request_id)
 
+    # Browser retry / double-click: replay the first result, touch nothing
+    idem_key = request_key()
+    if replay_result(idem_key, "finance.pay"):
+        return redirect(url_for("finance.payments"))
+
     amount_paid = request.form.get("amount_paid")
     receipt = request.files.get("receipt")
 
@@ -48,43 +71,41 @@ def pay(request_id):
         flash("Amount is required.", "danger")
         return redirect(url_for("finance.payments"))
 
-    receipt_url = None
-    receipt_public_id = None
-
+    # Receipt is hashed + spooled locally and uploaded in the background
+    # after commit (identical files already stored are reused, not re-uploaded)
+    spooled = None
     if receipt and receipt.filename:
-        if not CLOUDINARY_OK:
-            flash("Receipt upload not available.", "danger")
+        try:
+            spooled = spool_upload(receipt)
+        except Exception as e:
+            flash(f"Could not save receipt: {e}", "danger")
             return redirect(url_for("finance.payments"))
 
-        res = cloudinary.uploader.upload(
-            receipt,
-            folder="queensmeal/procurement/receipts",
-            resource_type="auto",
-        )
-        receipt_url = res.get("secure_url")
-        receipt_public_id = res.get("public_id")
-
     payment = Payment(
         procurement_request_id=req.id,
         amount=req.amount,                    # ✅ REQUIRED
         amount_paid=Decimal(amount_paid),
         paid_by_role="finance",
         paid_by_name=current_user.username,
-        receipt_url=receipt_url,
-        receipt_public_id=receipt_public_id,
-        receipt_uploaded_at=datetime.utcnow() if receipt_url else None,
         status="paid",
         created_at=datetime.utcnow(),
         paid_at=datetime.utcnow(),
     )
 
     try:
+        if spooled:
+            attach_upload(payment, spooled)
         db.session.add(payment)
         req.status = "paid"
+        record_key(idem_key, "finance.pay", payment, "Payment recorded.")
         db.session.commit()
+        enqueue_upload(payment)
         flash("Payment recorded.", "success")
     except Exception as e:
         db.session.rollback()
-        flash(f"Payment failed: {e}", "danger")
+        discard_spool(spooled)
+        # Lost the race to an identical submit: report the winner's result
+        if not replay_result(idem_key, "finance.pay"):
+            flash(f"Payment failed: {e}", "danger")
 
     return redirect(url_for("finance.payments"))
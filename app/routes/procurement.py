@@ -1,22 +1,20 @@
 from datetime import datetime
-from decimal import Decimal, InvalidOperation
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy import func
 
 from app.extensions import db
+from app.importer import import_requests, parse_amount, parse_quantity
+from app.pagination import clamp_per_page, keyset_page
+from app.search import search_requests
+from app.uploads import attach_upload, discard_spool, enqueue_upload, spool_upload
+from app.vendor_cache import get_vendor_catalog
 from app.models.procurement_request import ProcurementRequest
 from app.models.procurement_quotation import ProcurementQuotation
 from app.models.vendor import Vendor
 from app.models.payment import Payment
 
-# Optional: Cloudinary upload (won't break app if Cloudinary isn't installed)
-try:
-    import cloudinary.uploader
-    CLOUDINARY_OK = True
-except Exception:
-    CLOUDINARY_OK = False
-
 procurement_bp = Blueprint("procurement", __name__, url_prefix="/procurement")
 
 
@@ -31,18 +29,125 @@ def _require_role(*roles) -> bool:
     return True
 
 
+def _list_extras(rows):
+    """
+    Loads what the list template needs beyond the request row itself in a
+    fixed number of batched queries (never one query per row):
+      - vendors by id
+      - first quotation per request (only for rows that have one)
+    Counts / latest receipt come from the denormalized summary columns.
+    """
+    vendor_ids = {r.vendor_id for r in rows if r.vendor_id}
+    quoted_ids = [r.id for r in rows if r.quotation_count]
+
+    vendors = {}
+    first_quotations = {}
+
+    if vendor_ids:
+        vendors = {v.id: v for v in Vendor.query.filter(Vendor.id.in_(vendor_ids)).all()}
+
+    if quoted_ids:
+        first_ids = (
+            db.session.query(func.min(ProcurementQuotation.id))
+            .filter(ProcurementQuotation.procurement_request_id.in_(quoted_ids))
+            .group_by(ProcurementQuotation.procurement_request_id)
+        )
+        for quotation in ProcurementQuotation.query.filter(ProcurementQuotation.id.in_(first_ids)).all():
+            first_quotations[quotation.procurement_request_id] = quotation
+
+    return dict(vendors=vendors, first_quotations=first_quotations)
+
+
 @procurement_bp.route("/")
 @login_required
 def index():
-    requests_qs = (
-        ProcurementRequest.query
-        .order_by(ProcurementRequest.created_at.desc())
-        .all()
+    per_page = clamp_per_page(
+        request.args.get("per_page"),
+        current_app.config.get("PROCUREMENT_PAGE_SIZE", 50),
+        current_app.config.get("PROCUREMENT_PAGE_SIZE_MAX", 200),
+    )
+    cursor = request.args.get("cursor")
+
+    # Keyset pagination on (created_at, id): deep pages cost the same as page 1
+    requests_qs, next_cursor = keyset_page(
+        ProcurementRequest.query,
+        [ProcurementRequest.created_at, ProcurementRequest.id],
+        cursor,
+        per_page,
+    )
+
+    return render_template(
+        "procurement/index.html",
+        requests=requests_qs,
+        next_cursor=next_cursor,
+        is_first_page=not cursor,
+        per_page=per_page,
+        **_list_extras(requests_qs),
+    )
+
+
+def _search_args():
+    q = (request.args.get("q") or "").strip()
+    try:
+        page = max(int(request.args.get("page") or 1), 1)
+    except ValueError:
+        page = 1
+    per_page = clamp_per_page(
+        request.args.get("per_page"),
+        current_app.config.get("PROCUREMENT_PAGE_SIZE", 50),
+        current_app.config.get("PROCUREMENT_PAGE_SIZE_MAX", 200),
+    )
+    return q, page, per_page
+
+
+@procurement_bp.route("/search")
+@login_required
+def search():
+    q, page, per_page = _search_args()
+    if not q:
+        return redirect(url_for("procurement.index"))
+
+    results, has_next = search_requests(q, page=page, per_page=per_page)
+    rows = [r for r, _rank in results]
+
+    return render_template(
+        "procurement/search.html",
+        q=q,
+        requests=rows,
+        page=page,
+        per_page=per_page,
+        has_next=has_next,
+        **_list_extras(rows),
     )
 
-    # For receipt links, we’ll show latest payment receipt if available
-    # (No heavy joins — just simple relationship access in template)
-    return render_template("procurement/index.html", requests=requests_qs)
+
+@procurement_bp.route("/api/search")
+@login_required
+def api_search():
+    q, page, per_page = _search_args()
+    results, has_next = search_requests(q, page=page, per_page=per_page)
+    vendors = _list_extras([r for r, _rank in results])["vendors"]
+
+    return jsonify(
+        q=q,
+        page=page,
+        per_page=per_page,
+        has_next=has_next,
+        results=[
+            dict(
+                id=r.id,
+                item=r.item,
+                description=r.description,
+                vendor=vendors[r.vendor_id].name if r.vendor_id in vendors else None,
+                amount=float(r.amount or 0),
+                status=r.status,
+                is_urgent=bool(r.is_urgent),
+                created_at=r.created_at.isoformat() if r.created_at else None,
+                rank=rank,
+            )
+            for r, rank in results
+        ],
+    )
 
 
 @procurement_bp.route("/create", methods=["GET", "POST"])
@@ -52,12 +157,14 @@ def create():
     if not _require_role("procurement"):
         return redirect(url_for("procurement.index"))
 
-    vendors = Vendor.query.order_by(Vendor.name.asc()).all()
+    vendors = get_vendor_catalog()
 
     if request.method == "GET":
         return render_template("procurement/create.html", vendors=vendors)
 
     # POST — DO NOT allow hard crash: always handle errors
+    quotation = None
+    spooled = None
     try:
         item = (request.form.get("item") or "").strip()
         description = (request.form.get("description") or "").strip() or None
@@ -75,20 +182,10 @@ def create():
             return render_template("procurement/create.html", vendors=vendors)
 
         try:
-            quantity = int(qty_raw)
-            if quantity <= 0:
-                raise ValueError()
-        except Exception:
-            flash("Quantity must be a valid number greater than 0.", "danger")
-            return render_template("procurement/create.html", vendors=vendors)
-
-        try:
-            # store as Decimal to match Numeric columns
-            amount = Decimal(amount_raw)
-            if amount <= 0:
-                raise InvalidOperation()
-        except Exception:
-            flash("Amount must be a valid number greater than 0.", "danger")
+            quantity = parse_quantity(qty_raw)
+            amount = parse_amount(amount_raw)
+        except ValueError as e:
+            flash(str(e), "danger")
             return render_template("procurement/create.html", vendors=vendors)
 
         try:
@@ -116,37 +213,62 @@ def create():
         db.session.add(new_request)
         db.session.flush()  # get new_request.id without final commit
 
-        # Optional quotation upload -> save ProcurementQuotation(file_path=secure_url)
+        # Optional quotation: hash + spool locally now, upload in the background
+        # (ProcurementQuotation.file_path is filled in when the upload lands;
+        # a file we already stored is reused straight away)
         if quotation_file and quotation_file.filename:
-            if not CLOUDINARY_OK:
-                # Save request anyway, just warn
-                flash("Request saved, but quotation upload is not available (Cloudinary not configured).", "warning")
-            else:
-                try:
-                    res = cloudinary.uploader.upload(
-                        quotation_file,
-                        resource_type="auto",
-                        folder="queensmeal/procurement/quotations",
-                    )
-                    quotation_url = res.get("secure_url")
-                    if quotation_url:
-                        q = ProcurementQuotation(
-                            procurement_request_id=new_request.id,
-                            file_path=quotation_url,
-                            created_at=datetime.utcnow(),
-                        )
-                        db.session.add(q)
-                    else:
-                        flash("Request saved, but quotation upload returned no URL.", "warning")
-                except Exception as e:
-                    # Save request anyway, just warn
-                    flash(f"Request saved, but could not save quotation: {e}", "warning")
+            try:
+                spooled = spool_upload(quotation_file)
+                quotation = ProcurementQuotation(
+                    procurement_request_id=new_request.id,
+                    file_path="",
+                    created_at=datetime.utcnow(),
+                )
+                attach_upload(quotation, spooled)
+                db.session.add(quotation)
+            except Exception as e:
+                # Save request anyway, just warn (and don't leave the spooled file behind)
+                quotation = None
+                discard_spool(spooled)
+                flash(f"Request saved, but could not save quotation: {e}", "warning")
 
         db.session.commit()
+        enqueue_upload(quotation)
         flash("Request submitted successfully.", "success")
         return redirect(url_for("procurement.index"))
 
     except Exception as e:
         db.session.rollback()
+        discard_spool(spooled)
         flash(f"Could not save request: {e}", "danger")
         return render_template("procurement/create.html", vendors=vendors)
+
+
+@procurement_bp.route("/import", methods=["GET", "POST"])
+@login_required
+def import_file():
+    # Same permission as create(): procurement raises requests
+    if not _require_role("procurement"):
+        return redirect(url_for("procurement.index"))
+
+    if request.method == "GET":
+        return render_template("procurement/import.html", report=None)
+
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        flash("Choose an .xlsx or .csv file to import.", "danger")
+        return render_template("procurement/import.html", report=None)
+
+    try:
+        report = import_requests(upload.stream, upload.filename)
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Could not read file: {e}", "danger")
+        return render_template("procurement/import.html", report=None)
+
+    if report.inserted:
+        flash(f"Imported {report.inserted} request(s).", "success")
+    if report.failed:
+        flash(f"{report.failed} row(s) were skipped — see the report below.", "warning")
+
+    return render_template("procurement/import.html", report=report)
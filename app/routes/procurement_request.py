@@ -8,7 +8,7 @@ from werkzeug.utils import secure_filename
 
 from app.extensions import db
 from app.models.procurement_request import ProcurementRequest
-from app.models.vendor import Vendor
+from app.vendor_cache import get_vendor_catalog
 
 procurement_bp = Blueprint("procurement", __name__, url_prefix="/procurement")
 
@@ -35,7 +35,7 @@ def list_requests():
         return redirect(url_for("dashboard.home"))
 
     requests_q = ProcurementRequest.query.order_by(ProcurementRequest.created_at.desc()).all()
-    vendors = Vendor.query.order_by(Vendor.name.asc()).all()
+    vendors = get_vendor_catalog()
     return render_template("procurement/list.html", requests=requests_q, vendors=vendors)
 
 @procurement_bp.route("/new", methods=["GET", "POST"])
@@ -45,7 +45,7 @@ def create_request():
         flash("Only Procurement or Director can create requests.", "danger")
         return redirect(url_for("procurement.list_requests"))
 
-    vendors = Vendor.query.order_by(Vendor.name.asc()).all()
+    vendors = get_vendor_catalog()
 
     if request.method == "POST":
         title = (request.form.get("title") or "").strip()
@@ -118,7 +118,7 @@ def edit_request(request_id: int):
         return redirect(url_for("procurement.list_requests"))
 
     pr = ProcurementRequest.query.get_or_404(request_id)
-    vendors = Vendor.query.order_by(Vendor.name.asc()).all()
+    vendors = get_vendor_catalog()
 
     if request.method == "POST":
         pr.title = (request.form.get("title") or "").strip() or pr.title
@@ -1,5 +1,5 @@
-from datetime import datetime, timedelta
 import csv
+import os
 from io import StringIO
 
 from flask import (
@@ -10,13 +10,27 @@ from flask import (
     flash,
     request,
     Response,
+    current_app,
+    stream_with_context,
+    abort,
+    jsonify,
+    send_file,
+    make_response,
+    session,
 )
 from flask_login import login_required, current_user
-from sqlalchemy import func
 
-from app.extensions import db
-from app.models.procurement_request import ProcurementRequest
-from app.models.payment import Payment
+from app.data_version import cached_data_version
+from app.exports import xlsx_response
+from app.pdf_reports import pdf_path, report_status, request_report, valid_key
+from app.report_cache import cached_report, report_etag
+from app.report_engine import (
+    PAYMENT_EXPORT_HEADER,
+    iter_payment_export_rows,
+    normalize_filters,
+    parse_report_filters,
+    report_key,
+)
 
 reports_bp = Blueprint("reports", __name__, url_prefix="/reports")
 
@@ -38,179 +52,126 @@ def index():
     if not _require_role("director", "finance", "audit"):
         return redirect(url_for("procurement.index"))
 
-    # ---------------- Filters (SAFE DEFAULTS) ----------------
-    role_filter = request.args.get("paid_by_role") or "all"
-    start_date = request.args.get("start_date")
-    end_date = request.args.get("end_date")
-
-    try:
-        start_dt = datetime.strptime(start_date, "%Y-%m-%d") if start_date else datetime.utcnow() - timedelta(days=29)
-        end_dt = datetime.strptime(end_date, "%Y-%m-%d") if end_date else datetime.utcnow()
-    except ValueError:
-        start_dt = datetime.utcnow() - timedelta(days=29)
-        end_dt = datetime.utcnow()
-
-    # ---------------- KPIs ----------------
-    total_requests = db.session.query(func.count(ProcurementRequest.id)).scalar() or 0
-
-    approved_requests = (
-        db.session.query(func.count(ProcurementRequest.id))
-        .filter(func.lower(ProcurementRequest.status) == "approved")
-        .scalar()
-        or 0
-    )
+    # Unchanged data + same filters => same ETag => 304 without any report query
+    filters = normalize_filters(parse_report_filters(request.args))
+    version = cached_data_version()
+    etag = report_etag(report_key(filters, version), current_user)
+    # (pending flash messages need a fresh render to be shown)
+    if request.if_none_match.contains(etag) and not session.get("_flashes"):
+        resp = Response(status=304)
+    else:
+        # Two queries for the whole page on a miss (see app/report_engine.py)
+        report = cached_report(filters, version)
+        resp = make_response(render_template("reports/index.html", **report))
 
-    pending_requests = (
-        db.session.query(func.count(ProcurementRequest.id))
-        .filter(func.lower(ProcurementRequest.status) == "pending")
-        .scalar()
-        or 0
-    )
+    resp.set_etag(etag)
+    # Browser must revalidate every time (data moves), but may reuse on 304
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
 
-    rejected_requests = (
-        db.session.query(func.count(ProcurementRequest.id))
-        .filter(func.lower(ProcurementRequest.status) == "rejected")
-        .scalar()
-        or 0
-    )
 
-    paid_expr = func.coalesce(Payment.amount_paid, Payment.amount)
+@reports_bp.route("/export.csv", methods=["GET"])
+@login_required
+def export_csv():
+    if not _require_role("director", "finance", "audit"):
+        return redirect(url_for("procurement.index"))
+
+    filters = normalize_filters(parse_report_filters(request.args))
+    batch_size = int(current_app.config.get("EXPORT_BATCH_SIZE", 1000))
 
-    payments_q = Payment.query.filter(
-        func.coalesce(Payment.paid_at, Payment.created_at) >= start_dt,
-        func.coalesce(Payment.paid_at, Payment.created_at) <= end_dt,
-    )
+    def generate():
+        # Header goes out before the first row is fetched (fast first byte);
+        # rows are written in batches through a server-side cursor.
+        buffer = StringIO()
+        writer = csv.writer(buffer)
 
-    if role_filter != "all":
-        payments_q = payments_q.filter(func.lower(Payment.paid_by_role) == role_filter.lower())
-
-    total_paid = payments_q.with_entities(func.coalesce(func.sum(paid_expr), 0)).scalar() or 0
-
-    # ---------------- Charts ----------------
-
-    # Requests per day
-    day_rows = (
-        db.session.query(
-            func.date(ProcurementRequest.created_at).label("day"),
-            func.count(ProcurementRequest.id),
-        )
-        .filter(
-            ProcurementRequest.created_at >= start_dt,
-            ProcurementRequest.created_at <= end_dt,
-        )
-        .group_by(func.date(ProcurementRequest.created_at))
-        .order_by(func.date(ProcurementRequest.created_at))
-        .all()
-    )
+        def drain():
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            return chunk
 
-    day_map = {str(r[0]): int(r[1]) for r in day_rows}
-    days = [
-        (start_dt.date() + timedelta(days=i)).isoformat()
-        for i in range((end_dt.date() - start_dt.date()).days + 1)
-    ]
-    day_values = [day_map.get(d, 0) for d in days]
-
-    # Payments by role
-    role_rows = (
-        payments_q.with_entities(
-            func.lower(Payment.paid_by_role),
-            func.sum(paid_expr),
-        )
-        .group_by(func.lower(Payment.paid_by_role))
-        .all()
-    )
+        writer.writerow(PAYMENT_EXPORT_HEADER)
+        yield drain()
 
-    role_labels = [r[0] or "unknown" for r in role_rows]
-    role_values = [float(r[1] or 0) for r in role_rows]
+        for i, row in enumerate(iter_payment_export_rows(filters, batch_size), start=1):
+            writer.writerow(row)
+            if i % batch_size == 0:
+                yield drain()
+        if buffer.tell():
+            yield drain()
 
-    # Monthly spend  ✅ FIXED GROUP BY
-    month_expr = func.to_char(
-        func.date_trunc("month", func.coalesce(Payment.paid_at, Payment.created_at)),
-        "YYYY-MM",
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/csv",
+        headers={
+            "Content-Disposition": "attachment; filename=payments_report.csv",
+            "X-Accel-Buffering": "no",  # don't let nginx buffer the stream
+        },
     )
 
-    month_rows = (
-        payments_q.with_entities(
-            month_expr,
-            func.sum(paid_expr),
-        )
-        .group_by(month_expr)
-        .order_by(month_expr)
-        .all()
-    )
 
-    month_labels = [m[0] for m in month_rows]
-    month_values = [float(m[1] or 0) for m in month_rows]
-
-    return render_template(
-        "reports/index.html",
-        kpis=dict(
-            total_requests=total_requests,
-            approved_requests=approved_requests,
-            pending_requests=pending_requests,
-            rejected_requests=rejected_requests,
-            total_paid=float(total_paid),
-        ),
-        charts=dict(
-            requests_daily=dict(labels=days, values=day_values),
-            payments_by_role=dict(labels=role_labels, values=role_values),
-            monthly_spend=dict(labels=month_labels, values=month_values),
-        ),
-        filters=dict(
-            start_date=start_dt.date().isoformat(),
-            end_date=end_dt.date().isoformat(),
-            role=role_filter,
-        ),
+@reports_bp.route("/export.xlsx", methods=["GET"])
+@login_required
+def export_xlsx():
+    if not _require_role("director", "finance", "audit"):
+        return redirect(url_for("procurement.index"))
+
+    filters = normalize_filters(parse_report_filters(request.args))
+    batch_size = int(current_app.config.get("EXPORT_BATCH_SIZE", 1000))
+
+    # Same rows as the CSV, into a write-only workbook with typed cells
+    return xlsx_response(
+        "payments_report.xlsx",
+        "Payments",
+        PAYMENT_EXPORT_HEADER,
+        iter_payment_export_rows(filters, batch_size),
     )
 
 
-@reports_bp.route("/export.csv", methods=["GET"])
+# ---------------- PDF (rendered in the background, cached on disk) ----------------
+
+@reports_bp.route("/pdf", methods=["POST"])
 @login_required
-def export_csv():
+def pdf_request():
     if not _require_role("director", "finance", "audit"):
         return redirect(url_for("procurement.index"))
 
-    role_filter = request.args.get("paid_by_role") or "all"
-    start_date = request.args.get("start_date")
-    end_date = request.args.get("end_date")
+    key = request_report(parse_report_filters(request.form))
+    return redirect(url_for("reports.pdf_status", key=key))
 
-    start_dt = datetime.strptime(start_date, "%Y-%m-%d") if start_date else datetime.utcnow() - timedelta(days=29)
-    end_dt = datetime.strptime(end_date, "%Y-%m-%d") if end_date else datetime.utcnow()
 
-    q = Payment.query.filter(
-        func.coalesce(Payment.paid_at, Payment.created_at) >= start_dt,
-        func.coalesce(Payment.paid_at, Payment.created_at) <= end_dt,
-    )
+@reports_bp.route("/pdf/<key>", methods=["GET"])
+@login_required
+def pdf_status(key):
+    if not _require_role("director", "finance", "audit"):
+        return redirect(url_for("procurement.index"))
+    if not valid_key(key):
+        abort(404)
 
-    if role_filter != "all":
-        q = q.filter(func.lower(Payment.paid_by_role) == role_filter.lower())
-
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
-        "Payment ID",
-        "Procurement Request ID",
-        "Amount",
-        "Paid By Role",
-        "Paid By Name",
-        "Paid At",
-        "Receipt URL",
-    ])
-
-    for p in q.order_by(Payment.created_at.desc()).all():
-        writer.writerow([
-            p.id,
-            p.procurement_request_id,
-            p.amount_paid or p.amount,
-            p.paid_by_role,
-            p.paid_by_name,
-            p.paid_at,
-            p.receipt_url,
-        ])
-
-    output.seek(0)
-    return Response(
-        output.getvalue(),
-        mimetype="text/csv",
-        headers={"Content-Disposition": "attachment; filename=payments_report.csv"},
+    state = report_status(current_app, key)
+    if request.args.get("format") == "json":
+        return jsonify(state)
+    return render_template("reports/pdf_status.html", key=key, state=state)
+
+
+@reports_bp.route("/pdf/<key>/download", methods=["GET"])
+@login_required
+def pdf_download(key):
+    if not _require_role("director", "finance", "audit"):
+        return redirect(url_for("procurement.index"))
+    if not valid_key(key):
+        abort(404)
+
+    path = pdf_path(current_app, key)
+    if not os.path.exists(path):
+        abort(404)
+    # Keyed by content version: safe to let the browser keep it
+    return send_file(
+        path,
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name="spend_report.pdf",
+        conditional=True,
+        max_age=86400,
     )
@@ -0,0 +1,13 @@
+from flask import Blueprint, current_app, send_from_directory
+from flask_login import login_required
+
+from app.uploads import local_store_dir
+
+uploads_bp = Blueprint("uploads", __name__, url_prefix="/uploads")
+
+
+@uploads_bp.route("/files/<path:key>")
+@login_required
+def serve_file(key):
+    # Files pushed by the "local" storage backend
+    return send_from_directory(local_store_dir(current_app), key)
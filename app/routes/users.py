@@ -68,10 +68,8 @@ def toggle_user(user_id):
         flash("You cannot disable yourself.", "danger")
         return redirect(url_for("users.index"))
 
-    # SAFELY toggle using existing model logic
-    if hasattr(user, "is_active"):
-        user.status = "inactive" if user.is_active else "active"
-
+    user.status = "inactive" if user.is_active else "active"
+    # Commit drops the cached login record (app/user_cache.py)
     db.session.commit()
     flash("User status updated.", "success")
     return redirect(url_for("users.index"))
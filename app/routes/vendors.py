@@ -1,8 +1,9 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from flask_login import login_required
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required, current_user
 
 from app.extensions import db
 from app.models.vendor import Vendor
+from app.vendor_cache import get_vendor_catalog, vendor_cache_stats
 
 vendors_bp = Blueprint("vendors", __name__, url_prefix="/vendors")
 
@@ -10,10 +11,19 @@ vendors_bp = Blueprint("vendors", __name__, url_prefix="/vendors")
 @vendors_bp.route("/")
 @login_required
 def list_vendors():
-    vendors = Vendor.query.order_by(Vendor.name.asc()).all()
+    vendors = get_vendor_catalog()
     return render_template("vendors/list.html", vendors=vendors)
 
 
+@vendors_bp.route("/cache-stats")
+@login_required
+def cache_stats():
+    if (getattr(current_user, "role", "") or "").lower() != "director":
+        flash("Access denied.", "danger")
+        return redirect(url_for("vendors.list_vendors"))
+    return jsonify(vendor_cache_stats())
+
+
 @vendors_bp.route("/create", methods=["GET", "POST"])
 @login_required
 def create_vendor():
@@ -0,0 +1,275 @@
+"""
+Full-text search over procurement requests (item, description, vendor name).
+
+Index per backend:
+  - Postgres: `procurement_requests.search_vector` (tsvector) + GIN index
+  - SQLite:   `procurement_requests_fts` FTS5 shadow table (rowid = request id)
+
+Neither is mapped on the ORM model, so the model stays portable; the index is
+kept current by an after_flush hook (like app/audit.py) for the requests
+touched in that flush. `flask rebuild-search-index` creates/backfills it.
+If the index hasn't been created yet, search falls back to a LIKE scan (and
+each worker checks again every SEARCH_INDEX_RECHECK seconds).
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, event, or_, text
+from sqlalchemy import inspect as sa_inspect
+
+from app.extensions import db
+from app.models.procurement_request import ProcurementRequest
+from app.models.vendor import Vendor
+
+FTS_TABLE = "procurement_requests_fts"
+TS_CONFIG = "english"
+
+# engine url -> ("postgresql" | "sqlite" | None, probed at). A found index is
+# kept for good; "not created yet" is re-probed every SEARCH_INDEX_RECHECK
+# seconds so workers notice a migration / rebuild run by another process.
+_BACKENDS: Dict[str, Tuple[Optional[str], float]] = {}
+_recheck = 30.0
+
+
+def _detect_backend(connection) -> Optional[str]:
+    key = str(connection.engine.url)
+    hit = _BACKENDS.get(key)
+    if hit is not None and (hit[0] is not None or time.monotonic() - hit[1] < _recheck):
+        return hit[0]
+
+    backend = None
+    try:
+        insp = sa_inspect(connection)
+        dialect = connection.dialect.name
+        if dialect == "postgresql":
+            cols = {c["name"] for c in insp.get_columns("procurement_requests")}
+            if "search_vector" in cols:
+                backend = "postgresql"
+        elif dialect == "sqlite":
+            if FTS_TABLE in insp.get_table_names():
+                backend = "sqlite"
+    except Exception:
+        backend = None
+
+    _BACKENDS[key] = (backend, time.monotonic())
+    return backend
+
+
+def ensure_search_schema(connection) -> Optional[str]:
+    """Creates the tsvector column + GIN index (Postgres) or FTS5 table (SQLite)."""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        connection.execute(text("ALTER TABLE procurement_requests ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+        connection.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_procurement_requests_search "
+                "ON procurement_requests USING GIN (search_vector)"
+            )
+        )
+    elif dialect == "sqlite":
+        connection.execute(
+            text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                "USING fts5(item, description, vendor_name, tokenize='unicode61')"
+            )
+        )
+    _BACKENDS.pop(str(connection.engine.url), None)
+    return _detect_backend(connection)
+
+
+def reindex_requests(
+    connection,
+    request_ids: Optional[Iterable[int]] = None,
+    vendor_ids: Optional[Iterable[int]] = None,
+) -> None:
+    """
+    Rebuilds index entries for the given requests and/or every request of the
+    given vendors. With neither, rebuilds everything.
+    """
+    backend = _detect_backend(connection)
+    if backend is None:
+        return
+
+    req_ids = sorted({int(i) for i in (request_ids or []) if i is not None})
+    ven_ids = sorted({int(i) for i in (vendor_ids or []) if i is not None})
+    full = request_ids is None and vendor_ids is None
+    if not full and not req_ids and not ven_ids:
+        return
+
+    params: Dict[str, Any] = {}
+    where = "1 = 1"
+    if not full:
+        where = "(pr.id IN :req_ids OR pr.vendor_id IN :ven_ids)"
+        # never bind an empty IN list
+        params = {"req_ids": req_ids or [-1], "ven_ids": ven_ids or [-1]}
+
+    def _stmt(sql: str):
+        stmt = text(sql)
+        if not full:
+            stmt = stmt.bindparams(bindparam("req_ids", expanding=True), bindparam("ven_ids", expanding=True))
+        return stmt
+
+    if backend == "postgresql":
+        connection.execute(
+            _stmt(
+                f"""
+                UPDATE procurement_requests AS pr SET search_vector =
+                    setweight(to_tsvector('{TS_CONFIG}', coalesce(pr.item, '')), 'A')
+                    || setweight(to_tsvector('{TS_CONFIG}', coalesce(
+                        (SELECT v.name FROM vendors v WHERE v.id = pr.vendor_id), '')), 'B')
+                    || setweight(to_tsvector('{TS_CONFIG}', coalesce(pr.description, '')), 'C')
+                WHERE {where}
+                """
+            ),
+            params,
+        )
+        return
+
+    # SQLite FTS5: delete + re-insert the affected rows
+    if full:
+        connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    else:
+        connection.execute(
+            _stmt(
+                f"""
+                DELETE FROM {FTS_TABLE} WHERE rowid IN (
+                    SELECT pr.id FROM procurement_requests pr WHERE {where}
+                ) OR rowid IN :req_ids
+                """
+            ),
+            params,
+        )
+    connection.execute(
+        _stmt(
+            f"""
+            INSERT INTO {FTS_TABLE} (rowid, item, description, vendor_name)
+            SELECT pr.id, coalesce(pr.item, ''), coalesce(pr.description, ''), coalesce(v.name, '')
+            FROM procurement_requests pr
+            LEFT JOIN vendors v ON v.id = pr.vendor_id
+            WHERE {where}
+            """
+        ),
+        params,
+    )
+
+
+def _changed(obj: Any, *keys: str) -> bool:
+    try:
+        attrs = sa_inspect(obj).attrs
+        return any(attrs[k].history.has_changes() for k in keys)
+    except Exception:
+        return True
+
+
+def _after_flush(session, flush_context):
+    connection = session.connection()
+    if _detect_backend(connection) is None:
+        return
+
+    request_ids: Set[int] = set()
+    vendor_ids: Set[int] = set()
+
+    for obj in session.new:
+        if isinstance(obj, ProcurementRequest):
+            request_ids.add(obj.id)
+
+    for obj in session.dirty:
+        if isinstance(obj, ProcurementRequest) and _changed(obj, "item", "description", "vendor_id"):
+            request_ids.add(obj.id)
+        elif isinstance(obj, Vendor) and _changed(obj, "name"):
+            vendor_ids.add(obj.id)
+
+    # Deleted rows: reindexing a missing id just drops its FTS entry
+    for obj in session.deleted:
+        if isinstance(obj, ProcurementRequest):
+            request_ids.add(obj.id)
+
+    if request_ids or vendor_ids:
+        reindex_requests(connection, request_ids, vendor_ids)
+
+
+def _terms(q: str) -> List[str]:
+    return re.findall(r"\w+", (q or "").lower())[:8]
+
+
+def search_requests(q: str, page: int = 1, per_page: int = 25) -> Tuple[List[Tuple[ProcurementRequest, float]], bool]:
+    """
+    Ranked, paginated search. Every term must match (prefix match, so
+    "tom" finds "tomatoes"). Returns ([(request, rank), ...], has_next).
+    """
+    terms = _terms(q)
+    if not terms:
+        return [], False
+
+    page = max(int(page or 1), 1)
+    offset = (page - 1) * per_page
+    connection = db.session.connection()
+    backend = _detect_backend(connection)
+
+    if backend == "postgresql":
+        tsquery = " & ".join(f"{t}:*" for t in terms)
+        rows = connection.execute(
+            text(
+                f"""
+                SELECT id, ts_rank_cd(search_vector, query) AS rank
+                FROM procurement_requests, to_tsquery('{TS_CONFIG}', :tsquery) AS query
+                WHERE search_vector @@ query
+                ORDER BY rank DESC, id DESC
+                LIMIT :limit OFFSET :offset
+                """
+            ),
+            {"tsquery": tsquery, "limit": per_page + 1, "offset": offset},
+        ).all()
+    elif backend == "sqlite":
+        match = " ".join(f'"{t}"*' for t in terms)
+        rows = connection.execute(
+            text(
+                f"""
+                SELECT rowid AS id, -bm25({FTS_TABLE}, 10.0, 1.0, 5.0) AS rank
+                FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH :match
+                ORDER BY rank DESC, rowid DESC
+                LIMIT :limit OFFSET :offset
+                """
+            ),
+            {"match": match, "limit": per_page + 1, "offset": offset},
+        ).all()
+    else:
+        # Index not built yet: slow but correct LIKE scan, newest first
+        query = ProcurementRequest.query.outerjoin(Vendor, Vendor.id == ProcurementRequest.vendor_id)
+        for t in terms:
+            like = f"%{t}%"
+            query = query.filter(
+                or_(
+                    ProcurementRequest.item.ilike(like),
+                    ProcurementRequest.description.ilike(like),
+                    Vendor.name.ilike(like),
+                )
+            )
+        rows = [
+            (r.id, 0.0)
+            for r in query.order_by(ProcurementRequest.id.desc()).limit(per_page + 1).offset(offset).all()
+        ]
+
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    ranks = {int(r[0]): float(r[1] or 0) for r in rows}
+    by_id = {}
+    if ranks:
+        by_id = {r.id: r for r in ProcurementRequest.query.filter(ProcurementRequest.id.in_(list(ranks))).all()}
+
+    results = [(by_id[i], ranks[i]) for i in ranks if i in by_id]
+    return results, has_next
+
+
+def init_search(app) -> None:
+    global _recheck
+    _recheck = float(app.config.get("SEARCH_INDEX_RECHECK", 30))
+
+    if not event.contains(db.session, "after_flush", _after_flush):
+        event.listen(db.session, "after_flush", _after_flush)
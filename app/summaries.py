@@ -0,0 +1,86 @@
+"""
+Denormalized per-request summary columns on procurement_requests:
+quotation_count, payment_count, total_paid, last_paid_at, latest_receipt_url.
+
+List pages read these instead of loading every request's quotations/payments.
+They are refreshed in the same after_flush hook style app/audit.py uses, for
+the requests touched by that flush only, inside the business transaction.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional, Set
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy import inspect as sa_inspect
+
+from app.extensions import db
+from app.models.payment import Payment
+from app.models.procurement_quotation import ProcurementQuotation
+from app.models.procurement_request import ProcurementRequest
+
+
+def _summary_update():
+    pr = ProcurementRequest.__table__
+    q = ProcurementQuotation.__table__
+    p = Payment.__table__
+
+    paid_expr = func.coalesce(p.c.amount_paid, p.c.amount)
+    of_request = p.c.procurement_request_id == pr.c.id
+
+    return update(pr).values(
+        quotation_count=select(func.count(q.c.id))
+        .where(q.c.procurement_request_id == pr.c.id)
+        .scalar_subquery(),
+        payment_count=select(func.count(p.c.id)).where(of_request).scalar_subquery(),
+        total_paid=select(func.coalesce(func.sum(paid_expr), 0)).where(of_request).scalar_subquery(),
+        last_paid_at=select(func.max(p.c.effective_paid_at))
+        .where(of_request)
+        .scalar_subquery(),
+        latest_receipt_url=select(p.c.receipt_url)
+        .where(of_request, p.c.receipt_url.isnot(None))
+        .order_by(p.c.id.desc())
+        .limit(1)
+        .scalar_subquery(),
+    )
+
+
+def refresh_summaries(connection, request_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Recomputes the summary columns for `request_ids` (or every request when
+    None). One UPDATE statement regardless of how many ids.
+    """
+    stmt = _summary_update()
+    if request_ids is not None:
+        ids = sorted({int(i) for i in request_ids if i is not None})
+        if not ids:
+            return
+        stmt = stmt.where(ProcurementRequest.__table__.c.id.in_(ids))
+    connection.execute(stmt)
+
+
+def _touched_request_ids(session) -> Set[int]:
+    ids: Set[int] = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, (Payment, ProcurementQuotation)):
+            continue
+        if obj.procurement_request_id is not None:
+            ids.add(obj.procurement_request_id)
+        # Moved to another request: the old parent needs refreshing too
+        try:
+            hist = sa_inspect(obj).attrs.procurement_request_id.history
+            ids.update(v for v in hist.deleted if v is not None)
+        except Exception:
+            pass
+    return ids
+
+
+def _after_flush(session, flush_context):
+    ids = _touched_request_ids(session)
+    if ids:
+        refresh_summaries(session.connection(), ids)
+
+
+def init_summaries(app) -> None:
+    if not event.contains(db.session, "after_flush", _after_flush):
+        event.listen(db.session, "after_flush", _after_flush)
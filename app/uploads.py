@@ -0,0 +1,497 @@
+"""
+Background, content-addressed upload pipeline for quotations and receipts.
+
+Request path (fast):
+  1) spool_upload() streams the file to uploads/spool/ through a SHA-256
+     hasher in chunks; the spool file is named by its digest
+  2) attach_upload() points the row at stored_blobs[digest]:
+       - already uploaded  -> row gets the URL right away, no upload at all
+       - upload in flight  -> row waits on that same blob
+       - new content       -> a pending StoredBlob is created
+  3) commit, then enqueue_upload(row) AFTER the commit
+
+Worker path (background thread pool):
+  push the blob to the storage backend once (retries + exponential backoff),
+  then fill ProcurementQuotation.file_path / Payment.receipt_url on every row
+  waiting for that digest. Blobs that run out of attempts are marked
+  "failed" and keep their spool file; `flask retry-uploads` picks up
+  pending/failed blobs (e.g. after a worker restart).
+
+Reference counting: an after_flush hook adjusts stored_blobs.ref_count as
+ProcurementQuotation / Payment / Document rows gain or lose a digest.
+`flask gc-blobs` deletes unreferenced blobs from the backend.
+
+Backends:
+  - "cloudinary": the production store
+  - "local":      files copied under uploads/store/, served by the uploads
+                  blueprint (dev/tests, or when Cloudinary isn't configured)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+
+from app.extensions import db
+from app.models.document import Document
+from app.models.payment import Payment
+from app.models.procurement_quotation import ProcurementQuotation
+from app.models.stored_blob import StoredBlob
+
+BLOB_FOLDER = "queensmeal/procurement/blobs"
+CHUNK_SIZE = 64 * 1024
+
+# Rows that reference blobs (ref-counted)
+REFERENCING_MODELS = (ProcurementQuotation, Payment, Document)
+
+SpooledFile = namedtuple("SpooledFile", ["path", "digest", "size", "filename"])
+
+_app = None
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_in_flight: Set[str] = set()
+
+
+def _project_root(app) -> str:
+    return os.path.abspath(os.path.join(app.root_path, ".."))
+
+
+def spool_dir(app) -> str:
+    folder = app.config.get("UPLOAD_SPOOL_DIR") or os.path.join(_project_root(app), "uploads", "spool")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def local_store_dir(app) -> str:
+    folder = app.config.get("UPLOAD_LOCAL_STORE_DIR") or os.path.join(_project_root(app), "uploads", "store")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _ext(filename: Optional[str]) -> str:
+    _, ext = os.path.splitext(secure_filename(filename or ""))
+    return ext.lower()[:10]
+
+
+# ---------------- Storage backends ----------------
+
+class LocalStorageBackend:
+    """Copies blobs under uploads/store/blobs/<xx>/<digest><ext> and returns an app URL."""
+
+    name = "local"
+
+    def __init__(self, app):
+        self.root = local_store_dir(app)
+
+    def upload(self, path: str, digest: str, ext: str) -> Tuple[str, str, Optional[str]]:
+        key = f"blobs/{digest[:2]}/{digest}{ext}"
+        dest = os.path.join(self.root, *key.split("/"))
+        if not os.path.exists(dest):
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            tmp = f"{dest}.{uuid.uuid4().hex[:8]}.tmp"
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, dest)
+        return f"/uploads/files/{key}", key, None
+
+    def delete(self, public_id: str, resource_type: Optional[str] = None) -> None:
+        try:
+            os.remove(os.path.join(self.root, *public_id.split("/")))
+        except FileNotFoundError:
+            pass
+
+
+class CloudinaryStorageBackend:
+    name = "cloudinary"
+
+    def __init__(self, app):
+        from app.utils.cloudinary_service import init_cloudinary
+
+        init_cloudinary()
+
+    def upload(self, path: str, digest: str, ext: str) -> Tuple[str, str, Optional[str]]:
+        import cloudinary.uploader
+
+        # public_id = digest: the same content always maps to the same asset
+        res = cloudinary.uploader.upload(
+            path,
+            folder=BLOB_FOLDER,
+            public_id=digest,
+            resource_type="auto",
+            overwrite=False,
+            unique_filename=False,
+        )
+        url = res.get("secure_url")
+        if not url:
+            raise RuntimeError("Cloudinary upload returned no URL")
+        return url, res.get("public_id"), res.get("resource_type")
+
+    def delete(self, public_id: str, resource_type: Optional[str] = None) -> None:
+        import cloudinary.uploader
+
+        cloudinary.uploader.destroy(public_id, resource_type=resource_type or "image", invalidate=True)
+
+
+_BACKENDS = {
+    "local": LocalStorageBackend,
+    "cloudinary": CloudinaryStorageBackend,
+}
+
+
+def get_storage_backend(app):
+    name = (app.config.get("UPLOAD_BACKEND") or "local").lower()
+    cached = app.extensions.get("upload_backend")
+    if cached is None or cached.name != name:
+        cached = _BACKENDS[name](app)
+        app.extensions["upload_backend"] = cached
+    return cached
+
+
+# ---------------- Request path ----------------
+
+def hash_to_file(stream, folder: str) -> Tuple[str, str, int]:
+    """
+    Streams `stream` into `folder` in chunks while hashing it.
+    Returns (path, sha256 hex, size); the file is named by its digest, so
+    identical content lands on the same path (stored once).
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    tmp = os.path.join(folder, f".incoming-{uuid.uuid4().hex}")
+    try:
+        with open(tmp, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                size += len(chunk)
+                out.write(chunk)
+        digest = hasher.hexdigest()
+        path = os.path.join(folder, digest)
+        if os.path.exists(path):
+            os.remove(tmp)
+        else:
+            os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return path, digest, size
+
+
+def spool_upload(file_storage) -> SpooledFile:
+    """Hashes + spools a werkzeug FileStorage; returns a SpooledFile."""
+    from flask import current_app
+
+    path, digest, size = hash_to_file(file_storage.stream, spool_dir(current_app))
+    return SpooledFile(path, digest, size, secure_filename(file_storage.filename or "") or None)
+
+
+def _set_url(row, url: str, public_id: Optional[str]) -> None:
+    if isinstance(row, Payment):
+        row.receipt_url = url
+        row.receipt_public_id = public_id
+        row.receipt_uploaded_at = datetime.utcnow()
+    else:
+        row.file_path = url
+    row.upload_status = "uploaded"
+
+
+def _get_or_create_blob(spooled: SpooledFile) -> StoredBlob:
+    blob = db.session.get(StoredBlob, spooled.digest)
+    if blob is not None:
+        return blob
+
+    # Two requests may upload the same new file at once: the loser of the
+    # PK race just reuses the winner's row.
+    try:
+        with db.session.begin_nested():
+            blob = StoredBlob(
+                digest=spooled.digest,
+                size=spooled.size,
+                filename=spooled.filename,
+                status="pending",
+                spool_path=spooled.path,
+                created_at=datetime.utcnow(),
+            )
+            db.session.add(blob)
+        return blob
+    except IntegrityError:
+        return db.session.get(StoredBlob, spooled.digest)
+
+
+def attach_upload(row, spooled: SpooledFile) -> None:
+    """
+    Points a quotation/payment row at the blob for `spooled`.
+    Duplicates of an already-uploaded file get its URL immediately.
+    """
+    blob = _get_or_create_blob(spooled)
+    row.blob_digest = blob.digest
+
+    if blob.status == "uploaded" and blob.url:
+        _set_url(row, blob.url, blob.public_id)
+        discard_spool(spooled)
+        return
+
+    if blob.status == "failed" or not blob.spool_path or not os.path.exists(blob.spool_path):
+        # Previous attempt gave up (or lost its spool): retry with this copy
+        blob.status = "pending"
+        blob.spool_path = spooled.path
+
+    row.upload_status = "pending"
+    if isinstance(row, ProcurementQuotation) and row.file_path is None:
+        row.file_path = ""
+
+
+def discard_spool(spooled: Optional[SpooledFile]) -> None:
+    """
+    Removes a spool file nobody is waiting on (duplicate of an uploaded blob,
+    or a row that never got committed).
+    """
+    if not spooled:
+        return
+    try:
+        blob = db.session.get(StoredBlob, spooled.digest)
+        if blob is not None and blob.status != "uploaded" and blob.spool_path == spooled.path:
+            return
+        os.remove(spooled.path)
+    except Exception:
+        pass
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # Created lazily so gunicorn forks before any thread exists
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(_app.config.get("UPLOAD_WORKERS", 2)) if _app else 2
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload")
+        return _executor
+
+
+def enqueue_upload(row) -> None:
+    """Schedules the blob of a committed pending row for background upload."""
+    if row is None or getattr(row, "upload_status", None) != "pending" or not row.blob_digest:
+        return
+    digest = row.blob_digest
+    if _app is not None and _app.config.get("UPLOAD_SYNC"):
+        process_blob(digest)
+        return
+    with _executor_lock:
+        if digest in _in_flight:
+            return
+        _in_flight.add(digest)
+    _get_executor().submit(_run_job, digest)
+
+
+# ---------------- Worker path ----------------
+
+def _run_job(digest: str) -> None:
+    with _app.app_context():
+        try:
+            process_blob(digest)
+        except Exception as e:
+            _app.logger.warning(f"UPLOAD blob {digest[:12]} crashed: {e}")
+        finally:
+            db.session.remove()
+            with _executor_lock:
+                _in_flight.discard(digest)
+
+
+def _fill_waiting_rows(blob: StoredBlob) -> int:
+    n = 0
+    for model in (ProcurementQuotation, Payment):
+        for row in model.query.filter(model.blob_digest == blob.digest, model.upload_status != "uploaded").all():
+            _set_url(row, blob.url, blob.public_id)
+            n += 1
+    return n
+
+
+def process_blob(digest: str) -> bool:
+    """
+    Uploads one blob with retries/backoff, then fills every row waiting on
+    it. Needs an app context. Returns True when the blob ends up uploaded.
+    """
+    from flask import current_app
+
+    app = current_app._get_current_object()
+    blob = db.session.get(StoredBlob, digest)
+    if blob is None:
+        return False
+    if blob.status == "uploaded":
+        _fill_waiting_rows(blob)
+        db.session.commit()
+        return True
+
+    path, ext = blob.spool_path, _ext(blob.filename)
+    if not path or not os.path.exists(path):
+        blob.status = "failed"
+        db.session.commit()
+        app.logger.warning(f"UPLOAD blob {digest[:12]}: spool file missing ({path})")
+        return False
+
+    attempts = max(int(app.config.get("UPLOAD_MAX_ATTEMPTS", 5)), 1)
+    backoff = float(app.config.get("UPLOAD_RETRY_BACKOFF", 2.0))
+    backend = get_storage_backend(app)
+
+    # Don't hold a DB transaction open across slow uploads/backoff sleeps
+    db.session.rollback()
+
+    for attempt in range(attempts):
+        try:
+            url, public_id, resource_type = backend.upload(path, digest, ext)
+            break
+        except Exception as e:
+            app.logger.warning(f"UPLOAD blob {digest[:12]} attempt {attempt + 1}/{attempts} failed: {e}")
+            if attempt + 1 < attempts:
+                time.sleep(backoff * (2 ** attempt))
+    else:
+        blob = db.session.get(StoredBlob, digest)
+        blob.status = "failed"
+        for model in (ProcurementQuotation, Payment):
+            for row in model.query.filter(model.blob_digest == digest, model.upload_status == "pending").all():
+                row.upload_status = "failed"
+        db.session.commit()
+        return False
+
+    blob = db.session.get(StoredBlob, digest)
+    blob.status = "uploaded"
+    blob.url = url
+    blob.public_id = public_id
+    blob.resource_type = resource_type
+    blob.uploaded_at = datetime.utcnow()
+    blob.spool_path = None
+    _fill_waiting_rows(blob)
+    db.session.commit()
+
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return True
+
+
+def retry_pending_uploads() -> Tuple[int, int]:
+    """Synchronously uploads every pending/failed blob. Returns (ok, failed)."""
+    digests = {
+        r[0]
+        for r in db.session.query(StoredBlob.digest).filter(StoredBlob.status.in_(("pending", "failed"))).all()
+    }
+    # Rows still waiting whose blob has since been uploaded elsewhere
+    for model in (ProcurementQuotation, Payment):
+        digests.update(
+            r[0]
+            for r in db.session.query(model.blob_digest)
+            .filter(model.blob_digest.isnot(None), model.upload_status.in_(("pending", "failed")))
+            .distinct()
+            .all()
+        )
+
+    ok = failed = 0
+    for digest in sorted(digests):
+        if process_blob(digest):
+            ok += 1
+        else:
+            failed += 1
+    return ok, failed
+
+
+def gc_blobs(grace_hours: float = 24) -> Tuple[int, int]:
+    """
+    Deletes blobs no row references any more (ref_count <= 0) and that are
+    older than the grace period. Returns (blobs_deleted, bytes_freed).
+    """
+    from flask import current_app
+
+    app = current_app._get_current_object()
+    backend = get_storage_backend(app)
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+
+    candidates = [
+        (b.digest, b.public_id, b.resource_type, b.spool_path, int(b.size or 0))
+        for b in StoredBlob.query.filter(StoredBlob.ref_count <= 0, StoredBlob.created_at < cutoff).all()
+    ]
+
+    deleted = freed = 0
+    for digest, public_id, resource_type, spool_path, size in candidates:
+        # Re-check inside the DELETE: a new reference may have appeared
+        gone = db.session.execute(
+            text("DELETE FROM stored_blobs WHERE digest = :d AND ref_count <= 0"),
+            {"d": digest},
+        ).rowcount
+        if not gone:
+            db.session.rollback()
+            continue
+        try:
+            if public_id:
+                backend.delete(public_id, resource_type)
+            if spool_path and os.path.exists(spool_path):
+                os.remove(spool_path)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.warning(f"GC blob {digest[:12]} failed: {e}")
+            continue
+        db.session.commit()
+        deleted += 1
+        freed += size
+    return deleted, freed
+
+
+# ---------------- Reference counting ----------------
+
+def _ref_deltas(session) -> Dict[str, int]:
+    deltas: Dict[str, int] = defaultdict(int)
+
+    for obj in session.new:
+        if isinstance(obj, REFERENCING_MODELS) and obj.blob_digest:
+            deltas[obj.blob_digest] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, REFERENCING_MODELS):
+            hist = sa_inspect(obj).attrs.blob_digest.history
+            digest = (hist.deleted or hist.unchanged or [None])[0]
+            if digest:
+                deltas[digest] -= 1
+
+    for obj in session.dirty:
+        if isinstance(obj, REFERENCING_MODELS):
+            hist = sa_inspect(obj).attrs.blob_digest.history
+            if hist.has_changes():
+                for digest in hist.deleted:
+                    if digest:
+                        deltas[digest] -= 1
+                for digest in hist.added:
+                    if digest:
+                        deltas[digest] += 1
+
+    return {d: n for d, n in deltas.items() if n}
+
+
+def _after_flush(session, flush_context):
+    deltas = _ref_deltas(session)
+    if deltas:
+        session.connection().execute(
+            text("UPDATE stored_blobs SET ref_count = ref_count + :n WHERE digest = :d"),
+            [{"d": d, "n": n} for d, n in deltas.items()],
+        )
+
+
+def init_uploads(app) -> None:
+    global _app
+    _app = app
+
+    if not event.contains(db.session, "after_flush", _after_flush):
+        event.listen(db.session, "after_flush", _after_flush)
@@ -0,0 +1,128 @@
+"""
+Per-process cache for the Flask-Login user loader.
+
+Every authenticated request used to run `User.query.get(id)`. The loader now
+returns a CachedUser (id, username, role, active) kept for USER_CACHE_TTL
+seconds, so most page views never touch the users table.
+
+User inserts/updates/deletes drop the cached entry when their transaction
+commits (this process, immediately); other workers pick the change up
+within the TTL. Disabled users get no CachedUser at all, which logs them
+out on their next request.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from flask_login import UserMixin
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models.user import User
+
+_lock = threading.Lock()
+_users: Dict[int, Tuple["CachedUser", float]] = {}
+_generation = 0
+_ttl = 30.0
+
+
+@dataclass(frozen=True, eq=False)
+class CachedUser(UserMixin):
+    """Read-only stand-in for User as current_user (no session, no lazy loads)."""
+
+    id: int
+    username: str
+    role: str
+    active: bool = True
+
+    @property
+    def is_active(self):
+        return self.active
+
+    def __repr__(self):
+        return f"<CachedUser {self.username} ({self.role})>"
+
+
+def _load(user_id: int) -> Optional[CachedUser]:
+    row = (
+        db.session.query(User.id, User.username, User.role, User.status)
+        .filter(User.id == user_id)
+        .first()
+    )
+    if row is None:
+        return None
+    return CachedUser(id=row.id, username=row.username, role=row.role, active=(row.status or "active") != "inactive")
+
+
+def load_cached_user(user_id) -> Optional[CachedUser]:
+    """user_loader body: a cached CachedUser, or None for unknown/disabled users."""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    now = time.monotonic()
+    with _lock:
+        hit = _users.get(user_id)
+        if hit is not None and now - hit[1] < _ttl:
+            user = hit[0]
+            return user if user.active else None
+        generation = _generation
+
+    user = _load(user_id)
+    if user is None:
+        return None
+    with _lock:
+        # A User write committed while we were reading: don't cache old data
+        if generation == _generation:
+            _users[user_id] = (user, now)
+    return user if user.active else None
+
+
+def invalidate_users(*user_ids: int) -> None:
+    """Drops the given users (all users when called without ids)."""
+    global _generation
+    with _lock:
+        if user_ids:
+            for user_id in user_ids:
+                _users.pop(user_id, None)
+        else:
+            _users.clear()
+        _generation += 1
+
+
+def _after_flush(session, flush_context):
+    ids = session.info.setdefault("user_cache_stale", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            ids.add(obj.id)
+
+
+def _after_commit(session):
+    # Also fires on savepoint release: wait for the real commit
+    if session.get_nested_transaction() is not None:
+        return
+    ids = session.info.pop("user_cache_stale", None)
+    if ids:
+        invalidate_users(*ids)
+
+
+def _after_soft_rollback(session, previous_transaction):
+    # A rolled-back savepoint (or a flush failing inside one) keeps the ids:
+    # an extra eviction is harmless
+    if previous_transaction.parent is None:
+        session.info.pop("user_cache_stale", None)
+
+
+def init_user_cache(app) -> None:
+    global _ttl
+    _ttl = float(app.config.get("USER_CACHE_TTL", 30))
+
+    if not event.contains(db.session, "after_flush", _after_flush):
+        event.listen(db.session, "after_flush", _after_flush)
+        event.listen(db.session, "after_commit", _after_commit)
+        event.listen(db.session, "after_soft_rollback", _after_soft_rollback)
@@ -0,0 +1,125 @@
+"""
+Process-local vendor catalog cache.
+
+Vendor dropdowns and the vendor list read lightweight VendorEntry tuples from
+here instead of querying `vendors` on every GET / failed POST re-render.
+
+Invalidation:
+  - after_insert / after_update / after_delete on Vendor (this process),
+    and again on commit; a generation counter stops a load that started
+    before the commit from storing its (stale) rows afterwards
+  - VENDOR_CACHE_TTL seconds as a fallback for other gunicorn workers
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from app.extensions import db
+from app.models.vendor import Vendor
+
+VendorEntry = namedtuple("VendorEntry", ["id", "name", "bank_name", "account_number", "phone", "email"])
+
+_lock = threading.Lock()
+_entries: Optional[List[VendorEntry]] = None
+_loaded_at = 0.0
+_generation = 0
+_ttl = 60.0
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _load() -> List[VendorEntry]:
+    rows = (
+        db.session.query(
+            Vendor.id,
+            Vendor.name,
+            Vendor.bank_name,
+            Vendor.account_number,
+            Vendor.phone,
+            Vendor.email,
+        )
+        .order_by(Vendor.name.asc())
+        .all()
+    )
+    return [VendorEntry(*r) for r in rows]
+
+
+def get_vendor_catalog() -> List[VendorEntry]:
+    """All vendors ordered by name, as immutable tuples."""
+    global _entries, _loaded_at
+
+    with _lock:
+        if _entries is not None and (time.monotonic() - _loaded_at) < _ttl:
+            _stats["hits"] += 1
+            return _entries
+        _stats["misses"] += 1
+        generation = _generation
+
+    entries = _load()
+    with _lock:
+        # A vendor write committed while we were reading: don't cache old rows
+        if generation == _generation:
+            _entries = entries
+            _loaded_at = time.monotonic()
+    return entries
+
+
+def invalidate_vendor_catalog() -> None:
+    global _entries, _generation
+    with _lock:
+        _entries = None
+        _generation += 1
+        _stats["invalidations"] += 1
+
+
+def vendor_cache_stats() -> Dict[str, float]:
+    with _lock:
+        total = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "hit_ratio": round(_stats["hits"] / total, 4) if total else 0.0,
+            "cached": _entries is not None,
+            "size": len(_entries) if _entries is not None else 0,
+            "age_seconds": round(time.monotonic() - _loaded_at, 1) if _entries is not None else None,
+            "ttl_seconds": _ttl,
+        }
+
+
+def _on_vendor_write(mapper, connection, target):
+    invalidate_vendor_catalog()
+    session = object_session(target)
+    if session is not None:
+        session.info["vendor_catalog_dirty"] = True
+
+
+def _after_commit(session):
+    # Also fires on savepoint release: wait for the real commit
+    if session.get_nested_transaction() is not None:
+        return
+    if session.info.pop("vendor_catalog_dirty", False):
+        invalidate_vendor_catalog()
+
+
+def _after_soft_rollback(session, previous_transaction):
+    # Savepoint rollbacks keep the flag: an extra invalidation is harmless
+    if previous_transaction.parent is None:
+        session.info.pop("vendor_catalog_dirty", None)
+
+
+def init_vendor_cache(app) -> None:
+    global _ttl
+    _ttl = float(app.config.get("VENDOR_CACHE_TTL", 60))
+
+    for name in ("after_insert", "after_update", "after_delete"):
+        if not event.contains(Vendor, name, _on_vendor_write):
+            event.listen(Vendor, name, _on_vendor_write)
+
+    if not event.contains(db.session, "after_commit", _after_commit):
+        event.listen(db.session, "after_commit", _after_commit)
+        event.listen(db.session, "after_soft_rollback", _after_soft_rollback)
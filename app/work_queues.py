@@ -0,0 +1,73 @@
+"""
+Approval / payment work queues.
+
+Each queue is one status (+ optional amount band) ordered urgent-first, then
+newest-first, and keyset-paginated on (is_urgent, created_at, id). The partial
+indexes `ix_procurement_requests_queue_<status>` cover exactly that, so a page
+costs the same whether the table holds 100 requests or 10 years of history.
+
+Queues:
+  - pending            -> director approves / rejects
+  - approved, finance  -> amount <= FINANCE_LIMIT, finance pays
+  - approved, director -> amount >  FINANCE_LIMIT, director pays
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import case, func
+
+from app.constants import FINANCE_LIMIT
+from app.extensions import db
+from app.models.procurement_request import ProcurementRequest
+from app.pagination import clamp_per_page, keyset_page
+
+QUEUE_STATUSES = ("pending", "approved")
+BANDS = ("finance", "director")
+
+QUEUE_KEY = [ProcurementRequest.is_urgent, ProcurementRequest.created_at, ProcurementRequest.id]
+
+
+def queue_query(status: str, band: Optional[str] = None):
+    query = ProcurementRequest.query.filter(ProcurementRequest.status == status)
+    if band == "finance":
+        query = query.filter(ProcurementRequest.amount <= FINANCE_LIMIT)
+    elif band == "director":
+        query = query.filter(ProcurementRequest.amount > FINANCE_LIMIT)
+    return query
+
+
+def queue_page(status: str, band: Optional[str], cursor: Optional[str], raw_per_page=None, options=()) -> Tuple[List[ProcurementRequest], Optional[str], int]:
+    """Returns (rows, next_cursor, per_page) for one page of a queue."""
+    per_page = clamp_per_page(
+        raw_per_page,
+        current_app.config.get("WORK_QUEUE_PAGE_SIZE", 25),
+        current_app.config.get("WORK_QUEUE_PAGE_SIZE_MAX", 100),
+    )
+    query = queue_query(status, band)
+    if options:
+        query = query.options(*options)
+    rows, next_cursor = keyset_page(query, QUEUE_KEY, cursor, per_page)
+    return rows, next_cursor, per_page
+
+
+def queue_depths() -> Dict[str, int]:
+    """
+    Open items per queue, in one grouped query:
+    {"pending": n, "approved_finance": n, "approved_director": n}
+    """
+    band = case((ProcurementRequest.amount > FINANCE_LIMIT, "director"), else_="finance")
+    rows = (
+        db.session.query(ProcurementRequest.status, band, func.count(ProcurementRequest.id))
+        .filter(ProcurementRequest.status.in_(QUEUE_STATUSES))
+        .group_by(ProcurementRequest.status, band)
+        .all()
+    )
+
+    depths = {"pending": 0, "approved_finance": 0, "approved_director": 0}
+    for status, row_band, count in rows:
+        key = "pending" if status == "pending" else f"approved_{row_band}"
+        depths[key] = depths.get(key, 0) + int(count or 0)
+    return depths
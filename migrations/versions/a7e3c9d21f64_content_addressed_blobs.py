@@ -0,0 +1,53 @@
+"""content-addressed stored blobs
+
+Revision ID: a7e3c9d21f64
+Revises: f2b8c4d7e915
+Create Date: 2026-10-18 14:05:22.610384
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e3c9d21f64'
+down_revision = 'f2b8c4d7e915'
+branch_labels = None
+depends_on = None
+
+
+def _referencing_tables():
+    # `documents` only exists where the Document model was ever created
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    return [t for t in ('procurement_quotations', 'payments', 'documents') if t in existing]
+
+
+def upgrade():
+    op.create_table('stored_blobs',
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('spool_path', sa.String(length=500), nullable=True),
+    sa.Column('url', sa.String(length=500), nullable=True),
+    sa.Column('public_id', sa.String(length=255), nullable=True),
+    sa.Column('resource_type', sa.String(length=20), nullable=True),
+    sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('uploaded_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('digest')
+    )
+
+    for table in _referencing_tables():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('blob_digest', sa.String(length=64), nullable=True))
+            batch_op.create_index(batch_op.f(f'ix_{table}_blob_digest'), ['blob_digest'], unique=False)
+
+
+def downgrade():
+    for table in _referencing_tables():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_blob_digest'))
+            batch_op.drop_column('blob_digest')
+
+    op.drop_table('stored_blobs')
@@ -0,0 +1,27 @@
+"""user status column
+
+Revision ID: a9f3e6b2d504
+Revises: c5d9a3e7f812
+Create Date: 2026-10-18 18:41:07.215836
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9f3e6b2d504'
+down_revision = 'c5d9a3e7f812'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # users.toggle_user used to write a status attribute that had no column
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(length=20), nullable=False, server_default='active'))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('status')
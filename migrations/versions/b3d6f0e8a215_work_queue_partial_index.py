@@ -0,0 +1,37 @@
+"""work queue partial indexes
+
+Revision ID: b3d6f0e8a215
+Revises: a7e3c9d21f64
+Create Date: 2026-10-18 14:02:51.604117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d6f0e8a215'
+down_revision = 'a7e3c9d21f64'
+branch_labels = None
+depends_on = None
+
+
+QUEUES = ('pending', 'approved')
+
+
+def upgrade():
+    with op.batch_alter_table('procurement_requests', schema=None) as batch_op:
+        for status in QUEUES:
+            batch_op.create_index(
+                f'ix_procurement_requests_queue_{status}',
+                ['is_urgent', 'created_at', 'id', 'amount'],
+                unique=False,
+                postgresql_where=sa.text(f"status = '{status}'"),
+                sqlite_where=sa.text(f"status = '{status}'"),
+            )
+
+
+def downgrade():
+    with op.batch_alter_table('procurement_requests', schema=None) as batch_op:
+        for status in QUEUES:
+            batch_op.drop_index(f'ix_procurement_requests_queue_{status}')
@@ -0,0 +1,46 @@
+"""audit log viewer indexes
+
+Revision ID: b7e2f4a9c061
+Revises: f6a2d8e4b193
+Create Date: 2026-10-18 17:20:48.502117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2f4a9c061'
+down_revision = 'f6a2d8e4b193'
+branch_labels = None
+depends_on = None
+
+
+def _has_audit_logs():
+    # audit_logs predates these migrations on some databases (never created here)
+    return 'audit_logs' in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade():
+    if not _has_audit_logs():
+        return
+
+    # Legacy rows only have `entity`: the viewer filters on entity_type
+    op.execute('UPDATE audit_logs SET entity_type = entity WHERE entity_type IS NULL')
+
+    with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_audit_logs_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_audit_logs_entity', ['entity_type', 'entity_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_audit_logs_actor', ['actor_user_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_audit_logs_action', ['action', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    if not _has_audit_logs():
+        return
+
+    with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_audit_logs_action')
+        batch_op.drop_index('ix_audit_logs_actor')
+        batch_op.drop_index('ix_audit_logs_entity')
+        batch_op.drop_index('ix_audit_logs_created_at_id')
@@ -0,0 +1,26 @@
+"""procurement list keyset index
+
+Revision ID: c41d7e2a9f10
+Revises: 5b32cbfe7a51
+Create Date: 2026-10-18 09:12:04.118532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41d7e2a9f10'
+down_revision = '5b32cbfe7a51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('procurement_requests', schema=None) as batch_op:
+        batch_op.create_index('ix_procurement_requests_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('procurement_requests', schema=None) as batch_op:
+        batch_op.drop_index('ix_procurement_requests_created_at_id')
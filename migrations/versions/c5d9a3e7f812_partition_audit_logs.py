@@ -0,0 +1,100 @@
+"""partition audit_logs by month (postgres)
+
+Revision ID: c5d9a3e7f812
+Revises: b7e2f4a9c061
+Create Date: 2026-10-18 18:02:15.640391
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d9a3e7f812'
+down_revision = 'b7e2f4a9c061'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_audit_logs_created_at_id', 'created_at, id'),
+    ('ix_audit_logs_entity', 'entity_type, entity_id, created_at, id'),
+    ('ix_audit_logs_actor', 'actor_user_id, created_at, id'),
+    ('ix_audit_logs_action', 'action, created_at, id'),
+)
+
+
+def _add_months(value, months):
+    index = value.year * 12 + (value.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _relkind(bind):
+    return bind.execute(sa.text("SELECT relkind FROM pg_class WHERE relname = 'audit_logs'")).scalar()
+
+
+def upgrade():
+    # Only Postgres has declarative partitioning; SQLite keeps the plain table
+    # (closed months are range-deleted by `flask archive-audit`).
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql' or _relkind(bind) != 'r':
+        return
+
+    seq = bind.execute(sa.text("SELECT pg_get_serial_sequence('audit_logs', 'id')")).scalar()
+
+    op.execute('ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned')
+    op.execute('ALTER TABLE audit_logs_unpartitioned RENAME CONSTRAINT audit_logs_pkey TO audit_logs_unpartitioned_pkey')
+    for name, _cols in INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+    if seq:
+        op.execute(f'ALTER SEQUENCE {seq} OWNED BY NONE')
+
+    # The partition key has to be part of the primary key
+    op.execute('CREATE TABLE audit_logs (LIKE audit_logs_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)')
+    op.execute('ALTER TABLE audit_logs ADD PRIMARY KEY (id, created_at)')
+    op.execute('CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT')
+
+    oldest = bind.execute(sa.text('SELECT min(created_at) FROM audit_logs_unpartitioned')).scalar()
+    now = datetime.utcnow()
+    month = datetime((oldest or now).year, (oldest or now).month, 1)
+    last = _add_months(datetime(now.year, now.month, 1), 2)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE audit_logs_y{month.year:04d}m{month.month:02d} PARTITION OF audit_logs "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_add_months(month, 1):%Y-%m-%d}')"
+        )
+        month = _add_months(month, 1)
+
+    op.execute('INSERT INTO audit_logs SELECT * FROM audit_logs_unpartitioned')
+    if seq:
+        op.execute(f'ALTER SEQUENCE {seq} OWNED BY audit_logs.id')
+    op.execute('DROP TABLE audit_logs_unpartitioned')
+
+    for name, cols in INDEXES:
+        op.execute(f'CREATE INDEX {name} ON audit_logs ({cols})')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql' or _relkind(bind) != 'p':
+        return
+
+    seq = bind.execute(sa.text("SELECT pg_get_serial_sequence('audit_logs', 'id')")).scalar()
+
+    op.execute('ALTER TABLE audit_logs RENAME TO audit_logs_partitioned')
+    for name, _cols in INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+    if seq:
+        op.execute(f'ALTER SEQUENCE {seq} OWNED BY NONE')
+
+    op.execute('CREATE TABLE audit_logs (LIKE audit_logs_partitioned INCLUDING DEFAULTS)')
+    op.execute('INSERT INTO audit_logs SELECT * FROM audit_logs_partitioned')
+    op.execute('ALTER TABLE audit_logs_partitioned DROP CONSTRAINT IF EXISTS audit_logs_pkey')
+    op.execute('ALTER TABLE audit_logs ADD CONSTRAINT audit_logs_pkey PRIMARY KEY (id)')
+    if seq:
+        op.execute(f'ALTER SEQUENCE {seq} OWNED BY audit_logs.id')
+    op.execute('DROP TABLE audit_logs_partitioned CASCADE')
+
+    for name, cols in INDEXES:
+        op.execute(f'CREATE INDEX {name} ON audit_logs ({cols})')
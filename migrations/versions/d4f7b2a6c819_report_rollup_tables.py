@@ -0,0 +1,81 @@
+"""report rollup tables
+
+Revision ID: d4f7b2a6c819
+Revises: c9a4e1f7d302
+Create Date: 2026-10-18 15:26:43.501877
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f7b2a6c819'
+down_revision = 'c9a4e1f7d302'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('spend_daily_rollups',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('paid_by_role', sa.String(length=50), nullable=False),
+    sa.Column('payment_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('amount_paid', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('day', 'paid_by_role')
+    )
+    op.create_table('spend_monthly_rollups',
+    sa.Column('month', sa.String(length=7), nullable=False),
+    sa.Column('paid_by_role', sa.String(length=50), nullable=False),
+    sa.Column('payment_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('amount_paid', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('month', 'paid_by_role')
+    )
+    op.create_table('request_daily_rollups',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('request_count', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status')
+    )
+
+    # Backfill (plain SQL so later model changes can't break this revision;
+    # `flask rebuild-rollups` does the same against the current schema)
+    if op.get_bind().dialect.name == 'postgresql':
+        month = "to_char(date_trunc('month', coalesce(paid_at, created_at)), 'YYYY-MM')"
+    else:
+        month = "strftime('%Y-%m', coalesce(paid_at, created_at))"
+
+    op.execute(
+        """
+        INSERT INTO spend_daily_rollups (day, paid_by_role, payment_count, amount_paid)
+        SELECT date(coalesce(paid_at, created_at)), coalesce(lower(paid_by_role), ''),
+               count(id), coalesce(sum(coalesce(amount_paid, amount)), 0)
+        FROM payments
+        WHERE coalesce(paid_at, created_at) IS NOT NULL
+        GROUP BY date(coalesce(paid_at, created_at)), coalesce(lower(paid_by_role), '')
+        """
+    )
+    op.execute(
+        f"""
+        INSERT INTO spend_monthly_rollups (month, paid_by_role, payment_count, amount_paid)
+        SELECT {month}, coalesce(lower(paid_by_role), ''),
+               count(id), coalesce(sum(coalesce(amount_paid, amount)), 0)
+        FROM payments
+        WHERE coalesce(paid_at, created_at) IS NOT NULL
+        GROUP BY {month}, coalesce(lower(paid_by_role), '')
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO request_daily_rollups (day, status, request_count)
+        SELECT date(created_at), coalesce(lower(status), ''), count(id)
+        FROM procurement_requests
+        GROUP BY date(created_at), coalesce(lower(status), '')
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('request_daily_rollups')
+    op.drop_table('spend_monthly_rollups')
+    op.drop_table('spend_daily_rollups')
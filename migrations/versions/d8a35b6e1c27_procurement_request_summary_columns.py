@@ -0,0 +1,64 @@
+"""procurement request summary columns
+
+Revision ID: d8a35b6e1c27
+Revises: c41d7e2a9f10
+Create Date: 2026-10-18 10:03:51.402715
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a35b6e1c27'
+down_revision = 'c41d7e2a9f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('procurement_requests', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('quotation_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('payment_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('total_paid', sa.Numeric(precision=12, scale=2), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('last_paid_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('latest_receipt_url', sa.String(length=500), nullable=True))
+
+    # Backfill (same as `flask rebuild-summaries`)
+    op.execute(
+        """
+        UPDATE procurement_requests SET
+            quotation_count = (
+                SELECT COUNT(q.id) FROM procurement_quotations q
+                WHERE q.procurement_request_id = procurement_requests.id
+            ),
+            payment_count = (
+                SELECT COUNT(p.id) FROM payments p
+                WHERE p.procurement_request_id = procurement_requests.id
+            ),
+            total_paid = (
+                SELECT COALESCE(SUM(COALESCE(p.amount_paid, p.amount)), 0) FROM payments p
+                WHERE p.procurement_request_id = procurement_requests.id
+            ),
+            last_paid_at = (
+                SELECT MAX(COALESCE(p.paid_at, p.created_at)) FROM payments p
+                WHERE p.procurement_request_id = procurement_requests.id
+            ),
+            latest_receipt_url = (
+                SELECT p.receipt_url FROM payments p
+                WHERE p.procurement_request_id = procurement_requests.id
+                  AND p.receipt_url IS NOT NULL
+                ORDER BY p.id DESC
+                LIMIT 1
+            )
+        """
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('procurement_requests', schema=None) as batch_op:
+        batch_op.drop_column('latest_receipt_url')
+        batch_op.drop_column('last_paid_at')
+        batch_op.drop_column('total_paid')
+        batch_op.drop_column('payment_count')
+        batch_op.drop_column('quotation_count')
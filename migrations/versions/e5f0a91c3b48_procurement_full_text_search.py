@@ -0,0 +1,60 @@
+"""procurement full-text search index
+
+Revision ID: e5f0a91c3b48
+Revises: d8a35b6e1c27
+Create Date: 2026-10-18 11:20:37.845190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f0a91c3b48'
+down_revision = 'd8a35b6e1c27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Same DDL + backfill as `flask rebuild-search-index`, frozen here so later
+    # edits to app/search.py can't change what this revision does.
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('ALTER TABLE procurement_requests ADD COLUMN IF NOT EXISTS search_vector tsvector')
+        op.execute(
+            'CREATE INDEX IF NOT EXISTS ix_procurement_requests_search '
+            'ON procurement_requests USING GIN (search_vector)'
+        )
+        op.execute(
+            """
+            UPDATE procurement_requests AS pr SET search_vector =
+                setweight(to_tsvector('english', coalesce(pr.item, '')), 'A')
+                || setweight(to_tsvector('english', coalesce(
+                    (SELECT v.name FROM vendors v WHERE v.id = pr.vendor_id), '')), 'B')
+                || setweight(to_tsvector('english', coalesce(pr.description, '')), 'C')
+            """
+        )
+    elif dialect == 'sqlite':
+        op.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS procurement_requests_fts '
+            "USING fts5(item, description, vendor_name, tokenize='unicode61')"
+        )
+        op.execute('DELETE FROM procurement_requests_fts')
+        op.execute(
+            """
+            INSERT INTO procurement_requests_fts (rowid, item, description, vendor_name)
+            SELECT pr.id, coalesce(pr.item, ''), coalesce(pr.description, ''), coalesce(v.name, '')
+            FROM procurement_requests pr
+            LEFT JOIN vendors v ON v.id = pr.vendor_id
+            """
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_procurement_requests_search')
+        op.execute('ALTER TABLE procurement_requests DROP COLUMN IF EXISTS search_vector')
+    elif dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS procurement_requests_fts')
@@ -0,0 +1,32 @@
+"""payment effective_paid_at
+
+Revision ID: e8c1d5f3a470
+Revises: d4f7b2a6c819
+Create Date: 2026-10-18 16:05:12.774209
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8c1d5f3a470'
+down_revision = 'd4f7b2a6c819'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('effective_paid_at', sa.DateTime(), nullable=True))
+
+    op.execute('UPDATE payments SET effective_paid_at = coalesce(paid_at, created_at)')
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_payments_effective_paid_at'), ['effective_paid_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_payments_effective_paid_at'))
+        batch_op.drop_column('effective_paid_at')
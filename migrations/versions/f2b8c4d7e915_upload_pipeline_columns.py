@@ -0,0 +1,32 @@
+"""background upload pipeline columns
+
+Revision ID: f2b8c4d7e915
+Revises: e5f0a91c3b48
+Create Date: 2026-10-18 12:41:09.553870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8c4d7e915'
+down_revision = 'e5f0a91c3b48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('procurement_quotations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('upload_status', sa.String(length=20), nullable=True))
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('upload_status', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_column('upload_status')
+
+    with op.batch_alter_table('procurement_quotations', schema=None) as batch_op:
+        batch_op.drop_column('upload_status')
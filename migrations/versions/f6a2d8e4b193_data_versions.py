@@ -0,0 +1,31 @@
+"""data versions (report cache watermark)
+
+Revision ID: f6a2d8e4b193
+Revises: e8c1d5f3a470
+Create Date: 2026-10-18 16:42:37.318604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6a2d8e4b193'
+down_revision = 'e8c1d5f3a470'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('data_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    op.execute("INSERT INTO data_versions (name, version, updated_at) VALUES ('reports', 1, CURRENT_TIMESTAMP)")
+
+
+def downgrade():
+    op.drop_table('data_versions')
@@ -0,0 +1,142 @@
+"""
+Query-count guard for the reports page (see app/report_engine.py).
+
+The whole page is two grouped rollup queries, whatever the number of
+requests, payments or vendors. If this count starts growing with the data,
+an N+1 pattern has crept back in.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+
+from app import create_app
+from app.config import Config
+from app.data_version import invalidate_cached_versions
+from app.extensions import db
+from app.models.payment import Payment
+from app.models.procurement_request import ProcurementRequest
+from app.models.user import User
+from app.models.vendor import Vendor
+from app.report_cache import clear_report_cache
+from app.user_cache import invalidate_users
+
+REPORT_QUERIES = 2
+# Cold caches: + the login user (app/user_cache.py) + the data version (app/data_version.py)
+COLD_QUERIES = REPORT_QUERIES + 2
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    # In-memory SQLite shared by every connection (hooks commit on their own)
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", "sqlite://", raising=False)
+    monkeypatch.setattr(
+        Config,
+        "SQLALCHEMY_ENGINE_OPTIONS",
+        {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}},
+        raising=False,
+    )
+    for name in ("UPLOAD_SPOOL_DIR", "UPLOAD_LOCAL_STORE_DIR", "AUDIT_SPOOL_DIR", "PDF_REPORT_DIR", "AUDIT_ARCHIVE_DIR"):
+        monkeypatch.setattr(Config, name, str(tmp_path / name.lower()), raising=False)
+
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+
+    # No app context held across requests: each one loads its user like in production
+    yield app
+
+    with app.app_context():
+        db.drop_all()
+
+    clear_report_cache()
+    invalidate_cached_versions()
+    invalidate_users()
+
+
+def _seed(app, requests):
+    with app.app_context():
+        director = User(username="director", role="director")
+        director.set_password("pw")
+        db.session.add(director)
+
+        vendors = [Vendor(name=f"Vendor {i}") for i in range(3)]
+        db.session.add_all(vendors)
+        db.session.flush()
+
+        now = datetime.utcnow()
+        for i in range(requests):
+            req = ProcurementRequest(
+                item=f"Item {i}",
+                quantity=1,
+                amount=100 + i,
+                status="approved",
+                vendor_id=vendors[i % len(vendors)].id,
+            )
+            db.session.add(req)
+            db.session.flush()
+            db.session.add(
+                Payment(
+                    procurement_request_id=req.id,
+                    amount=100 + i,
+                    paid_by_role="finance" if i % 2 else "director",
+                    paid_by_name="seed",
+                    paid_at=now - timedelta(days=i),
+                )
+            )
+        db.session.commit()
+
+
+def _count_queries(app, fn):
+    count = [0]
+
+    def on_execute(*_args):
+        count[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    return count[0]
+
+
+def _logged_in_client(app):
+    client = app.test_client()
+    resp = client.post("/login", data={"username": "director", "password": "pw"})
+    assert resp.status_code == 302
+    return client
+
+
+@pytest.mark.parametrize("requests", [3, 30])
+def test_reports_page_query_count_is_fixed(app, requests):
+    _seed(app, requests)
+    client = _logged_in_client(app)
+    assert client.get("/reports/").status_code == 200  # warms the user + version caches
+
+    clear_report_cache()
+    resp = None
+
+    def get_page():
+        nonlocal resp
+        resp = client.get("/reports/")
+
+    assert _count_queries(app, get_page) == REPORT_QUERIES
+    assert resp.status_code == 200
+    assert f"<b>{requests}</b>".encode() in resp.data  # Total Requests
+
+
+def test_reports_page_query_count_cold(app):
+    _seed(app, 10)
+    client = _logged_in_client(app)
+
+    clear_report_cache()
+    invalidate_cached_versions()
+    invalidate_users()
+
+    assert _count_queries(app, lambda: client.get("/reports/")) == COLD_QUERIES